@@ -0,0 +1,189 @@
+import asyncio
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+
+from .models import UserChange
+from .utils.single_flight import AsyncSingleFlight
+
+
+DEFAULTS = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 1000,
+    # committed changes numbered per sequencing pass
+    'SEQUENCE_BATCH_SIZE': 500,
+    'POLL_INTERVAL': 1.0,
+    'HEARTBEAT_INTERVAL': 15,
+    # streams are closed after this long; clients reconnect with Last-Event-ID
+    'MAX_STREAM_SECONDS': 300,
+    'RETENTION_DAYS': 30,
+}
+
+# the fields downstream services receive; saves that touch none of them are not logged
+FEED_FIELDS = ('id', 'firebase_uid', 'email', 'first_name', 'last_name')
+
+
+def get_change_feed_config():
+    return dict(DEFAULTS, **getattr(settings, 'USER_CHANGE_FEED', {}))
+
+
+def record_user_change(user, operation, update_fields=None):
+    """
+    Append a change for `user` to the log, in the transaction that saved or deleted it.
+    """
+    if update_fields is not None and not set(update_fields) & set(FEED_FIELDS):
+        return None
+    return UserChange.objects.create(
+        user_id=user.pk,
+        firebase_uid=user.firebase_uid,
+        operation=operation,
+        data={field: str(getattr(user, field)) if field == 'id' else getattr(user, field) for field in FEED_FIELDS},
+    )
+
+
+def sequence_changes(limit=None):
+    """
+    Number committed changes that have no sequence yet, in id order.
+
+    Ids are allocated when a row is inserted, so a long transaction can commit a lower id
+    after higher ones have been read. Sequences are allocated here instead, after commit:
+    a change is only seen once its transaction has committed, and numbering carries on from
+    the highest committed sequence, so when a sequence is visible every lower one already is.
+    Concurrent passes collide on the unique `sequence` and all but one give up; the rows
+    they held are numbered by the next pass.
+
+    Returns:
+    - int: The number of changes numbered.
+
+    """
+    limit = limit or get_change_feed_config()['SEQUENCE_BATCH_SIZE']
+    numbered = 0
+    try:
+        with transaction.atomic():
+            pending = list(
+                UserChange.objects.filter(sequence__isnull=True).order_by('id').values_list('id', flat=True)[:limit]
+            )
+            if not pending:
+                return 0
+            last = UserChange.objects.aggregate(last=Max('sequence'))['last'] or 0
+            for change_id in pending:
+                # a change numbered by a concurrent pass is left as it is
+                numbered += UserChange.objects.filter(id=change_id, sequence__isnull=True).update(
+                    sequence=last + numbered + 1
+                )
+    except IntegrityError:
+        return 0
+    return numbered
+
+
+def serialize_change(change):
+    return {
+        'cursor': change.sequence,
+        'operation': change.operation,
+        'user_id': str(change.user_id),
+        'firebase_uid': change.firebase_uid,
+        'data': change.data,
+        'created_at': change.created_at.isoformat(),
+    }
+
+
+def fetch_changes(cursor=0, limit=None):
+    """
+    Return up to `limit` serialized changes after `cursor`, in commit order.
+
+    Every committed change is returned exactly once to a consumer that passes back the last
+    cursor it received. A change becomes visible once it has been numbered, by this call or
+    a concurrent one, shortly after its transaction commits.
+    """
+    config = get_change_feed_config()
+    limit = min(limit or config['PAGE_SIZE'], config['MAX_PAGE_SIZE'])
+    sequence_changes()
+    changes = UserChange.objects.filter(sequence__gt=cursor).order_by('sequence')[:limit]
+    return [serialize_change(change) for change in changes]
+
+
+def prune_changes(retention_days=None):
+    """
+    Delete changes older than `retention_days`; returns the number of rows deleted.
+    """
+    retention_days = retention_days or get_change_feed_config()['RETENTION_DAYS']
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    expired = UserChange.objects.filter(created_at__lt=cutoff)
+    # the newest numbered change is kept, so that numbering carries on after the cursors consumers hold
+    newest = UserChange.objects.aggregate(newest=Max('sequence'))['newest']
+    if newest is not None:
+        expired = expired.exclude(sequence__gte=newest)
+    deleted, _ = expired.delete()
+    return deleted
+
+
+# consumers that have caught up wait on the same cursor; they share one query per poll
+_poll_flight = AsyncSingleFlight('user_change_poll')
+_fetch_changes_async = sync_to_async(fetch_changes)
+
+
+def _authenticate_stream(request):
+    from .firebase_auth.firebase_authentication import FirebaseClaimsAuthentication, InternalTokenAuthentication
+    # internal tokens are checked first, as on the other change feed endpoint
+    authenticated = InternalTokenAuthentication().authenticate(request)
+    decoded_token = authenticated[1] if authenticated else FirebaseClaimsAuthentication().get_decoded_token(request)
+    return bool(decoded_token and decoded_token.get('is_staff'))
+
+
+def _parse_cursor(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+async def user_change_stream(request):
+    """
+    Server-Sent Events stream of `User` changes, for staff service accounts.
+
+    Resumes after the `Last-Event-ID` header or the `cursor` query parameter. Each event
+    carries the change cursor as its id, `user.<operation>` as its type and the change as
+    JSON data. Comment lines are sent as heartbeats while there is nothing new.
+    """
+    try:
+        allowed = await sync_to_async(_authenticate_stream)(request)
+    except APIException as e:
+        return JsonResponse({"status": "failed", "message": str(e.detail)}, status=e.status_code)
+    if not allowed:
+        return JsonResponse({"status": "failed", "message": "Staff claim required."}, status=403)
+
+    cursor = _parse_cursor(request.headers.get('Last-Event-ID', request.GET.get('cursor', 0)))
+    if cursor is None:
+        return JsonResponse({"status": "failed", "message": "cursor must be an integer."}, status=400)
+
+    config = get_change_feed_config()
+
+    async def events(cursor):
+        loop = asyncio.get_running_loop()
+        closes_at = loop.time() + config['MAX_STREAM_SECONDS']
+        last_sent = loop.time()
+        yield f"retry: {int(config['POLL_INTERVAL'] * 1000)}\n\n"
+        while loop.time() < closes_at:
+            changes = await _poll_flight.do(cursor, _fetch_changes_async, cursor)
+            for change in changes:
+                cursor = change['cursor']
+                yield f"id: {cursor}\nevent: user.{change['operation']}\ndata: {json.dumps(change)}\n\n"
+            if changes:
+                last_sent = loop.time()
+                continue
+            if loop.time() - last_sent >= config['HEARTBEAT_INTERVAL']:
+                last_sent = loop.time()
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(config['POLL_INTERVAL'])
+
+    response = StreamingHttpResponse(events(cursor), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
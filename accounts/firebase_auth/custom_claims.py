@@ -0,0 +1,126 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from firebase_admin import auth
+
+from .revocation import revoke_refresh_tokens
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'FLUSH_INTERVAL': 2.0,
+    'BATCH_SIZE': 100,
+    # revoke existing tokens when a user loses a privilege, so that stale claims stop authorizing right away
+    'REVOKE_ON_DEMOTION': True,
+}
+
+
+def build_custom_claims(user):
+    """
+    Build the authorization claims mirrored from a `User` into Firebase.
+
+    Args:
+    - `user` (User): The user, ideally with `groups` prefetched.
+
+    Returns:
+    - dict: `is_staff`, `is_superuser` and the sorted group names as `roles`.
+
+    """
+    return {
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+        'roles': sorted(group.name for group in user.groups.all()),
+    }
+
+
+class CustomClaimsSync:
+    """
+    Batch writes of `User` roles into Firebase custom claims.
+
+    Role changes only enqueue the user's primary key. A background thread loads all queued
+    users in one query and writes their current claims, so several changes to the same user
+    collapse into a single Firebase call carrying the latest state.
+
+    Methods:
+    - `enqueue`: Queue a user whose roles changed.
+    - `flush`: Write the claims of every queued user.
+    - `stats`: Queued/written/failed/revoked counters.
+
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._counters = {'queued': 0, 'written': 0, 'failed': 0, 'revoked': 0}
+
+    @property
+    def config(self):
+        return dict(DEFAULTS, **getattr(settings, 'FIREBASE_CUSTOM_CLAIMS', {}))
+
+    def enqueue(self, user_pk, demoted=False):
+        if not self.config['ENABLED']:
+            return
+        with self._lock:
+            self._pending[user_pk] = self._pending.get(user_pk, False) or demoted
+            self._counters['queued'] += 1
+        self._ensure_started()
+
+    def flush(self):
+        from accounts.models import User
+        config = self.config
+        with self._flush_lock:
+            with self._lock:
+                to_write = self._pending
+                self._pending = {}
+            pending = list(to_write.items())
+            for start in range(0, len(pending), config['BATCH_SIZE']):
+                batch = dict(pending[start:start + config['BATCH_SIZE']])
+                users = User.objects.filter(pk__in=batch, firebase_uid__isnull=False).prefetch_related('groups')
+                for user in users:
+                    try:
+                        auth.set_custom_user_claims(user.firebase_uid, build_custom_claims(user))
+                        self._counters['written'] += 1
+                        if batch[user.pk] and config['REVOKE_ON_DEMOTION']:
+                            revoke_refresh_tokens(user.firebase_uid)
+                            self._counters['revoked'] += 1
+                    except auth.UserNotFoundError:
+                        self._counters['failed'] += 1
+                    except Exception:
+                        self._counters['failed'] += 1
+                        logger.warning("Could not sync custom claims of firebase user %s; will retry.",
+                                       user.firebase_uid, exc_info=True)
+                        with self._lock:
+                            self._pending.setdefault(user.pk, batch[user.pk])
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, pending=len(self._pending))
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='custom-claims-sync', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.config['FLUSH_INTERVAL'])
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not sync custom claims.")
+            close_old_connections()
+
+
+custom_claims_sync = CustomClaimsSync()
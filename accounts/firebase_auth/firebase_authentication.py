@@ -1,8 +1,15 @@
 from rest_framework import authentication
-from .firebase_exceptions import NoAuthToken, InvalidAuthToken, FirebaseError, EmailVerification
+from .firebase_exceptions import NoAuthToken, InvalidAuthToken, RevokedAuthToken, FirebaseError, EmailVerification
 from firebase_admin import auth, credentials
 import firebase_admin
 from accounts.models import User
+from django.db import router
+from accounts.utils.single_flight import SingleFlight
+from .tenants import firebase_tenants
+from .internal_tokens import is_internal_token, verify_internal_token
+from .principal import FirebasePrincipal, active_user_cache
+from .token_cache import VerifiedTokenCache
+from django.conf import settings
 import os
 
 # Firebase Admin SDK credentials
@@ -14,6 +21,66 @@ except Exception:
     raise FirebaseError("Firebase Admin SDK credentials not found. Please add the path to the credentials file to the FIREBASE_ADMIN_SDK_CREDENTIALS_PATH environment variable.")
 
 
+# concurrent requests carrying the same token share one verification and one user lookup
+token_verification_flight = SingleFlight('token_verification')
+user_lookup_flight = SingleFlight('user_lookup')
+# verified tokens are reused until they expire, so a token pays for RS256 verification once per process
+verified_token_cache = VerifiedTokenCache(
+    max_entries=getattr(settings, 'FIREBASE_TOKEN_CACHE', {}).get('MAX_ENTRIES', 10000),
+    ttl=getattr(settings, 'FIREBASE_TOKEN_CACHE', {}).get('TTL', 300),
+)
+
+
+def _verify_and_cache(id_token):
+    decoded_token = auth.verify_id_token(id_token)
+    verified_token_cache.set(id_token, decoded_token)
+    return decoded_token
+
+
+def verify_id_token(id_token, host=None):
+    """
+    Verify a Firebase ID token, serving it from the verified-token cache when possible
+    and coalescing concurrent verifications of the same token.
+
+    With `FIREBASE_TENANTS` enabled, tokens of other projects and tenants (picked by `host`
+    or by the token's claims) are verified by that tenant's own client and caches.
+    """
+    tenant = firebase_tenants.resolve(id_token, host)
+    if tenant is not None:
+        decoded_token = tenant.verify_id_token(id_token)
+    elif getattr(settings, 'FIREBASE_TOKEN_CACHE', {}).get('ENABLED', True):
+        decoded_token = verified_token_cache.get(id_token)
+        if decoded_token is None:
+            decoded_token = token_verification_flight.do(id_token, _verify_and_cache, id_token)
+    else:
+        decoded_token = token_verification_flight.do(id_token, auth.verify_id_token, id_token)
+    # cached and coalesced claims are shared between requests; each request gets its own dict
+    return dict(decoded_token)
+
+
+# coalesced lookups share the row values only; every caller builds its own User from them
+USER_FIELDS = [field.attname for field in User._meta.concrete_fields]
+
+
+def _fetch_user_row(uid, project_id, tenant_id):
+    return User.objects.filter(
+        firebase_uid=uid, firebase_project_id=project_id, firebase_tenant_id=tenant_id, pending_deletion=False,
+    ).values_list(*USER_FIELDS).get()
+
+
+def get_user_by_firebase_uid(uid, project_id=None, tenant_id=None):
+    """
+    Fetch the user for a firebase uid, coalescing concurrent lookups of the same uid.
+
+    The uid is looked up in its project and tenant (see `FirebaseTenantRegistry.user_scope`),
+    None being the default project without a tenant. Each caller gets its own `User`
+    instance, so a view changing `request.user` does not change the user of the requests it
+    was coalesced with.
+    """
+    row = user_lookup_flight.do((uid, project_id, tenant_id), _fetch_user_row, uid, project_id, tenant_id)
+    return User.from_db(router.db_for_read(User), USER_FIELDS, row)
+
+
 class FirebaseAuthentication(authentication.BaseAuthentication):
     """
     Firebase Authentication class.
@@ -25,6 +92,7 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
 
     Methods:
     - `authenticate`: Authenticate the user using Firebase.
+    - `get_decoded_token`: Verify the request's Firebase token and return its claims.
     - `get_user`: Get the user associated with the given Firebase token.
 
     """
@@ -38,7 +106,23 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         - `request` (Request): The request object.
 
         Returns:
-        - tuple: A tuple containing the user and the token.
+        - tuple: A tuple containing the user and the decoded token.
+
+        """
+        decoded_token = self.get_decoded_token(request)
+        if not decoded_token:
+            return None
+        return (self.get_user(decoded_token), decoded_token)
+
+    def get_decoded_token(self, request):
+        """
+        Verify the request's Firebase token.
+
+        Args:
+        - `request` (Request): The request object.
+
+        Returns:
+        - dict: The decoded token claims.
 
         """
         auth_header = request.META.get('HTTP_AUTHORIZATION')
@@ -47,7 +131,7 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         id_token = auth_header.split(' ').pop()
         decoded_token = None
         try:
-            decoded_token = auth.verify_id_token(id_token)
+            decoded_token = verify_id_token(id_token, host=request.META.get('HTTP_HOST'))
         except Exception:
             raise InvalidAuthToken("Invalid authentication token provided.")
         if not id_token or not decoded_token:
@@ -56,14 +140,76 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         email_verified = decoded_token.get('email_verified')
         if not email_verified:
             raise EmailVerification("Email not verified. please verify your email address.")
-        
+
+        # revocation is checked against a local cache instead of a Firebase user fetch per request
+        if firebase_tenants.revocation_cache_for(decoded_token).is_revoked(decoded_token):
+            raise RevokedAuthToken("Authentication token has been revoked. please sign in again.")
+        return decoded_token
+
+    def get_user(self, decoded_token):
+        """
+        Get the user associated with the given Firebase token.
+
+        Args:
+        - `decoded_token` (dict): The decoded token claims.
+
+        Returns:
+        - FirebasePrincipal: A principal that loads the user on first use, when `FIREBASE_AUTH_LAZY_USER` is on.
+        - User: The user with the token's firebase uid, otherwise.
+
+        """
+        if getattr(settings, 'FIREBASE_AUTH_LAZY_USER', True):
+            # the account must exist and not be pending deletion; only loading its row is deferred
+            if not active_user_cache.is_active(decoded_token.get('uid'), *firebase_tenants.user_scope(decoded_token)) \
+                    and firebase_tenants.provision_user(decoded_token) is None:
+                raise FirebaseError("The user proivded with auth token is not a firebase user. it has no firebase uid.")
+            return FirebasePrincipal(decoded_token)
         try:
             uid = decoded_token.get('uid')
         except Exception:
             raise FirebaseError("The user proivded with auth token is not a firebase user. it has no firebase uid.")
     
         try:
-            user = User.objects.get(firebase_uid=uid)
+            user = get_user_by_firebase_uid(uid, *firebase_tenants.user_scope(decoded_token))
         except User.DoesNotExist:
-            raise FirebaseError("The user proivded with auth token is not a firebase user. it has no firebase uid.")
-        return (user, None)
\ No newline at end of file
+            # users of other projects and tenants may be created on their first request
+            user = firebase_tenants.provision_user(decoded_token)
+            if user is None:
+                raise FirebaseError("The user proivded with auth token is not a firebase user. it has no firebase uid.")
+        return user
+
+
+class FirebaseClaimsAuthentication(FirebaseAuthentication):
+    """
+    Firebase Authentication class for authorization-only endpoints.
+
+    Authenticates from the token alone and always returns a `FirebasePrincipal`, so together
+    with the claims permission classes in `accounts.permissions` a request is served without
+    touching the database.
+    """
+
+    def get_user(self, decoded_token):
+        return FirebasePrincipal(decoded_token)
+
+
+class InternalTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Authentication class for internal access tokens minted by the `auth/internal-token/` exchange.
+
+    Services calling each other present the internal token instead of the Firebase ID token,
+    and it is checked with one HMAC instead of an RS256 verification. Requests carrying any
+    other token are left to the next authentication class, so list this one first.
+    """
+
+    def authenticate(self, request):
+        auth_header = request.META.get('HTTP_AUTHORIZATION')
+        if not auth_header:
+            return None
+        token = auth_header.split(' ').pop()
+        if not is_internal_token(token):
+            return None
+        decoded_token = verify_internal_token(token)
+        # the token keeps the firebase iat, so revoking the user also rejects tokens already exchanged
+        if firebase_tenants.revocation_cache_for(decoded_token).is_revoked(decoded_token):
+            raise RevokedAuthToken("Authentication token has been revoked. please sign in again.")
+        return (FirebasePrincipal(decoded_token), decoded_token)
@@ -29,6 +29,15 @@ class ExpiredAuthToken(APIException):
     default_code = 'expired_auth_token'
 
 
+class RevokedAuthToken(APIException):
+    """
+    Exception class for revoked authentication token.
+    """
+    status_code = status.HTTP_401_UNAUTHORIZED
+    default_detail = 'Revoked authentication token provided.'
+    default_code = 'revoked_auth_token'
+
+
 class FirebaseError(APIException):
     """
     Exception class for firebase error.
@@ -44,4 +53,13 @@ class EmailVerification(APIException):
     """
     status_code = status.HTTP_400_BAD_REQUEST
     default_detail = 'Email not verified.'
-    default_code = 'email_not_verified'
\ No newline at end of file
+    default_code = 'email_not_verified'
+
+
+class RevocationCheckFailed(APIException):
+    """
+    Exception class for a revocation check that could not be completed.
+    """
+    status_code = status.HTTP_401_UNAUTHORIZED
+    default_detail = 'Authentication token could not be checked for revocation. please try again.'
+    default_code = 'revocation_check_failed'
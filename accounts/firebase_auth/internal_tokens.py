@@ -0,0 +1,120 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from django.conf import settings
+
+from .firebase_exceptions import InvalidAuthToken, ExpiredAuthToken
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    # key id -> secret; tokens are signed with ACTIVE_KEY and accepted under any listed key
+    'KEYS': {},
+    'ACTIVE_KEY': None,
+    # seconds an internal token is valid; never longer than the firebase token it was exchanged for
+    'LIFETIME': 300,
+}
+
+# every internal token starts with this, which tells it apart from a firebase ID token
+PREFIX = 'it1'
+
+
+def get_internal_token_config():
+    return dict(DEFAULTS, **getattr(settings, 'INTERNAL_TOKENS', {}))
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _sign(secret, signing_input):
+    return hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+
+
+def is_internal_token(token):
+    return token.startswith(PREFIX + '.')
+
+
+def mint_internal_token(decoded_token, user_id=None):
+    """
+    Mint an internal access token from a verified Firebase token.
+
+    The token is `it1.<key id>.<claims>.<HMAC-SHA256>`, base64url encoded. It carries the
+    uid, email, user id and role claims, and keeps the Firebase `iat` so that revocation
+    checks treat it like the token it was exchanged for.
+
+    Args:
+    - `decoded_token` (dict): Claims of the verified Firebase ID token.
+    - `user_id` (str): Primary key of the user, when known.
+
+    Returns:
+    - tuple: The token and its lifetime in seconds.
+
+    """
+    config = get_internal_token_config()
+    key_id = config['ACTIVE_KEY']
+    secret = config['KEYS'].get(key_id)
+    if not config['ENABLED'] or not secret:
+        raise ValueError("Internal tokens need INTERNAL_TOKENS ACTIVE_KEY set to one of its KEYS.")
+
+    now = int(time.time())
+    expires_at = now + config['LIFETIME']
+    if decoded_token.get('exp'):
+        expires_at = min(expires_at, int(decoded_token['exp']))
+    claims = {
+        'uid': decoded_token.get('uid'),
+        'email': decoded_token.get('email'),
+        'email_verified': bool(decoded_token.get('email_verified')),
+        'user_id': str(user_id) if user_id is not None else None,
+        'iat': decoded_token.get('iat', now),
+        'exp': expires_at,
+    }
+    for claim in ('is_staff', 'is_superuser', 'roles', 'aud', 'firebase'):
+        if claim in decoded_token:
+            claims[claim] = decoded_token[claim]
+
+    signing_input = f"{PREFIX}.{key_id}.{_b64encode(json.dumps(claims, separators=(',', ':')).encode())}"
+    return f'{signing_input}.{_b64encode(_sign(secret, signing_input))}', expires_at - now
+
+
+def verify_internal_token(token):
+    """
+    Check an internal token's signature and expiry with a single keyed hash.
+
+    Returns:
+    - dict: The token claims, shaped like a decoded Firebase token.
+
+    Raises:
+    - InvalidAuthToken: When internal tokens are disabled, or the token is malformed, signed
+      with an unknown key or tampered with.
+    - ExpiredAuthToken: When the token has expired.
+
+    """
+    config = get_internal_token_config()
+    if not config['ENABLED']:
+        raise InvalidAuthToken("Invalid authentication token provided.")
+    try:
+        signing_input, signature = token.rsplit('.', 1)
+        prefix, key_id, payload = signing_input.split('.')
+    except ValueError:
+        raise InvalidAuthToken("Invalid authentication token provided.")
+    secret = config['KEYS'].get(key_id) if prefix == PREFIX else None
+    if not secret:
+        raise InvalidAuthToken("Invalid authentication token provided.")
+    try:
+        valid = hmac.compare_digest(_b64decode(signature), _sign(secret, signing_input))
+        claims = json.loads(_b64decode(payload)) if valid else None
+    except ValueError:
+        raise InvalidAuthToken("Invalid authentication token provided.")
+    if not isinstance(claims, dict):
+        raise InvalidAuthToken("Invalid authentication token provided.")
+    if claims.get('exp', 0) <= time.time():
+        raise ExpiredAuthToken("Expired authentication token provided.")
+    return claims
@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from accounts.utils.single_flight import SingleFlight
+from .firebase_exceptions import FirebaseError
+
+
+DEFAULTS = {
+    # seconds a uid is known to belong to an active user; saves and deletes in this process invalidate it at once
+    'TTL': 30,
+    'MAX_ENTRIES': 10000,
+}
+
+
+class ActiveUserCache:
+    """
+    Bounded cache of the firebase uids that belong to a user who exists and is not pending deletion.
+
+    Uids are scoped by their project and tenant, as stored on `User`.
+
+    Lazy principals are only handed out for uids found here or confirmed by an `exists()`
+    query, so a valid token for an unknown or deleted account is rejected when the request
+    is authenticated, while the full `User` row is still only loaded on first use. Saves and
+    deletes made by this process drop the uid right away; those made by other processes are
+    seen within `TTL` seconds.
+
+    Methods:
+    - `is_active`: Whether a uid belongs to an active user.
+    - `invalidate`: Forget a uid so that it is checked again.
+    - `stats`: Hit and miss counters.
+
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight('active_user_check')
+        self._counters = {'hits': 0, 'misses': 0}
+
+    @property
+    def config(self):
+        return dict(DEFAULTS, **getattr(settings, 'FIREBASE_AUTH_USER_CACHE', {}))
+
+    def is_active(self, uid, project_id=None, tenant_id=None):
+        if not uid:
+            return False
+        key = (uid, project_id, tenant_id)
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is not None and expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return True
+            self._counters['misses'] += 1
+
+        active = self._flight.do(key, self._exists, *key)
+        if active:
+            config = self.config
+            with self._lock:
+                self._entries[key] = time.monotonic() + config['TTL']
+                self._entries.move_to_end(key)
+                while len(self._entries) > config['MAX_ENTRIES']:
+                    self._entries.popitem(last=False)
+        return active
+
+    def invalidate(self, uid, project_id=None, tenant_id=None):
+        with self._lock:
+            self._entries.pop((uid, project_id, tenant_id), None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries))
+
+    def _exists(self, uid, project_id, tenant_id):
+        from accounts.models import User
+        return User.objects.filter(
+            firebase_uid=uid, firebase_project_id=project_id, firebase_tenant_id=tenant_id, pending_deletion=False,
+        ).exists()
+
+
+active_user_cache = ActiveUserCache()
+
+
+class FirebasePrincipal:
+    """
+    Lightweight `request.user` built from the claims of a decoded Firebase token.
+
+    `uid`, `email` and the role claims synced by `accounts.firebase_auth.custom_claims` are
+    answered from the token. `FirebaseAuthentication` checks through `active_user_cache` that
+    the account exists before handing one out. Any other attribute (`pk`, `first_name`, `date_joined`, ...)
+    transparently loads the `User` row once, on first access, and is read from it.
+
+    Attributes:
+    - `uid` (str): The firebase uid.
+    - `email` (str): The email in the token.
+    - `claims` (dict): The decoded token.
+
+    """
+    __slots__ = ('uid', 'email', 'claims', '_user')
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, decoded_token):
+        self.uid = decoded_token.get('uid')
+        self.email = decoded_token.get('email')
+        self.claims = decoded_token
+        self._user = None
+
+    @property
+    def firebase_uid(self):
+        return self.uid
+
+    @property
+    def is_staff(self):
+        if 'is_staff' in self.claims:
+            return bool(self.claims['is_staff'])
+        return self.user.is_staff
+
+    @property
+    def is_superuser(self):
+        if 'is_superuser' in self.claims:
+            return bool(self.claims['is_superuser'])
+        return self.user.is_superuser
+
+    @property
+    def roles(self):
+        return list(self.claims.get('roles', ()))
+
+    @property
+    def is_loaded(self):
+        return self._user is not None
+
+    @property
+    def user(self):
+        """
+        The `User` row for this uid, loaded on first access.
+        """
+        if self._user is None:
+            from .firebase_authentication import get_user_by_firebase_uid
+            from .tenants import firebase_tenants
+            from accounts.models import User
+            try:
+                self._user = get_user_by_firebase_uid(self.uid, *firebase_tenants.user_scope(self.claims))
+            except User.DoesNotExist:
+                raise FirebaseError("The user proivded with auth token is not a firebase user. it has no firebase uid.")
+        return self._user
+
+    def __getattr__(self, name):
+        # only called for attributes the principal does not define itself
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __eq__(self, other):
+        other_uid = getattr(other, 'firebase_uid', None)
+        return other_uid is not None and other_uid == self.uid
+
+    def __hash__(self):
+        return hash(self.uid)
+
+    def __str__(self):
+        return self.email or self.uid
+
+    def __repr__(self):
+        return f'<FirebasePrincipal {self.uid}>'
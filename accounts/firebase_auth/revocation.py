@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from firebase_admin import auth
+
+from accounts.utils.single_flight import SingleFlight
+from .firebase_exceptions import RevocationCheckFailed
+
+
+logger = logging.getLogger(__name__)
+
+SYNC = 'sync'
+ASYNC = 'async'
+DENY = 'deny'
+ALLOW = 'allow'
+
+DEFAULTS = {
+    'ENABLED': True,
+    # seconds before a cached tokens_valid_after_time is refreshed in the background
+    'TTL': 300,
+    # on a uid never seen before: 'sync' fetches it on the request, 'async' accepts the token and fetches in the background
+    'COLD_MISS': ASYNC,
+    # when a 'sync' cold miss cannot fetch the user: 'deny' rejects the token, 'allow' accepts it
+    'ON_ERROR': DENY,
+    'MAX_ENTRIES': 100000,
+    'WORKERS': 2,
+}
+
+# every token of a deleted or disabled user is revoked
+ALWAYS_REVOKED = float('inf')
+
+
+class RevocationCache:
+    """
+    Local cache of each firebase user's `tokens_valid_after_time`.
+
+    A token is revoked when it was issued before that time, which is what
+    `verify_id_token(check_revoked=True)` checks with a Firebase user fetch on every call.
+    Here the fetch happens at most once per uid and `TTL`, off the request path, so
+    revocations made elsewhere take effect within `TTL`. Revocations and deletions made
+    by this process take effect immediately through `mark_revoked`.
+
+    Args:
+    - `auth_client` (auth.Client): Client users are fetched with; the default app when None.
+    - `max_entries` (int): Cap on cached uids; `MAX_ENTRIES` from the settings when None.
+
+    Methods:
+    - `is_revoked`: Whether a decoded token has been revoked. Raises `RevocationCheckFailed`
+      when a 'sync' cold miss cannot fetch the user and `ON_ERROR` is 'deny'.
+    - `mark_revoked`: Revoke every token issued so far for a uid.
+    - `invalidate`: Forget a uid so that it is fetched again.
+    - `stats`: Hit and refresh counters.
+    - `close`: Stop the background refresh workers.
+
+    """
+
+    def __init__(self, auth_client=None, max_entries=None):
+        self._auth_client = auth_client
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight('revocation_refresh')
+        self._executor = None
+        self._closed = False
+        self._refreshing = set()
+        self._counters = {'hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_errors': 0, 'revoked': 0}
+
+    @property
+    def config(self):
+        return dict(DEFAULTS, **getattr(settings, 'FIREBASE_REVOCATION_CHECK', {}))
+
+    def is_revoked(self, decoded_token):
+        config = self.config
+        if not config['ENABLED']:
+            return False
+        uid = decoded_token.get('uid')
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is not None:
+                self._entries.move_to_end(uid)
+
+        if entry is None:
+            self._counters['misses'] += 1
+            if config['COLD_MISS'] == SYNC:
+                try:
+                    valid_after = self._refresh(uid)
+                except Exception:
+                    self._counters['refresh_errors'] += 1
+                    logger.warning("Could not fetch the revocation state of firebase user %s.", uid, exc_info=True)
+                    if config['ON_ERROR'] == ALLOW:
+                        return False
+                    raise RevocationCheckFailed()
+            else:
+                self._schedule_refresh(uid)
+                return False
+        else:
+            self._counters['hits'] += 1
+            valid_after, fetched_at = entry
+            if time.monotonic() - fetched_at > config['TTL']:
+                self._schedule_refresh(uid)
+
+        revoked = decoded_token.get('iat', 0) < valid_after
+        if revoked:
+            self._counters['revoked'] += 1
+        return revoked
+
+    def mark_revoked(self, uid, valid_after=None):
+        """
+        Reject every token for `uid` issued before `valid_after` (now by default, in epoch seconds).
+        """
+        self._store(uid, int(time.time()) if valid_after is None else valid_after)
+
+    def invalidate(self, uid):
+        with self._lock:
+            self._entries.pop(uid, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries))
+
+    def close(self):
+        with self._lock:
+            # a closed cache never starts workers again, even for refreshes already on their way
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _store(self, uid, valid_after, fetch_started_at=None):
+        with self._lock:
+            entry = self._entries.get(uid)
+            if fetch_started_at is not None and entry is not None and entry[1] > fetch_started_at:
+                # a local revocation landed while the fetch was in flight and is at least as recent
+                return
+            self._entries[uid] = (valid_after, time.monotonic())
+            self._entries.move_to_end(uid)
+            while len(self._entries) > (self._max_entries or self.config['MAX_ENTRIES']):
+                self._entries.popitem(last=False)
+
+    def _schedule_refresh(self, uid):
+        with self._lock:
+            if self._closed or uid in self._refreshing:
+                return
+            self._refreshing.add(uid)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.config['WORKERS'],
+                                                    thread_name_prefix='revocation-refresh')
+            executor = self._executor
+        try:
+            executor.submit(self._refresh_quietly, uid)
+        except RuntimeError:
+            # closed since the lock was released
+            with self._lock:
+                self._refreshing.discard(uid)
+
+    def _refresh_quietly(self, uid):
+        try:
+            self._refresh(uid)
+        except Exception:
+            self._counters['refresh_errors'] += 1
+            logger.warning("Could not refresh the revocation state of firebase user %s.", uid, exc_info=True)
+        finally:
+            with self._lock:
+                self._refreshing.discard(uid)
+
+    def _refresh(self, uid):
+        # concurrent refreshes of one uid share a single Firebase user fetch
+        return self._flight.do(uid, self._fetch, uid)
+
+    def _fetch(self, uid):
+        self._counters['refreshes'] += 1
+        started_at = time.monotonic()
+        try:
+            user = (self._auth_client or auth).get_user(uid)
+        except auth.UserNotFoundError:
+            valid_after = ALWAYS_REVOKED
+        else:
+            if user.disabled:
+                valid_after = ALWAYS_REVOKED
+            else:
+                valid_after = (user.tokens_valid_after_timestamp or 0) / 1000
+        self._store(uid, valid_after, fetch_started_at=started_at)
+        return valid_after
+
+
+revocation_cache = RevocationCache()
+
+
+def revoke_refresh_tokens(uid):
+    """
+    Revoke a user's refresh tokens on Firebase and reject their current ID tokens right away.
+    """
+    auth.revoke_refresh_tokens(uid)
+    revocation_cache.mark_revoked(uid)
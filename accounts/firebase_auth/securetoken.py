@@ -0,0 +1,109 @@
+import hashlib
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from accounts.utils.metrics import metrics
+from accounts.utils.single_flight import SingleFlight
+
+
+DEFAULTS = {
+    'URL': 'https://securetoken.googleapis.com',
+    'API_KEY': None,
+    'POOL_SIZE': 20,
+    'TIMEOUT': 10,
+}
+
+
+class SecureTokenError(Exception):
+    """
+    Raised when the securetoken endpoint rejects a refresh token or cannot be reached.
+    """
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SecureTokenClient:
+    """
+    Client for Google's securetoken endpoint, which exchanges Firebase refresh tokens for ID tokens.
+
+    Requests go through one keep-alive connection pool shared by every worker thread, and
+    concurrent refreshes of the same refresh token share a single upstream call.
+
+    Attributes:
+    - `url` (str): Base URL of the securetoken service; point it at a local stub in tests.
+
+    Methods:
+    - `refresh`: Exchange a refresh token.
+
+    """
+
+    def __init__(self, url, api_key, pool_size=20, timeout=10):
+        self.url = url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.flight = SingleFlight('token_refresh')
+
+    def refresh(self, refresh_token):
+        """
+        Exchange `refresh_token` for a new ID token.
+
+        Returns:
+        - dict: The securetoken response (`id_token`, `refresh_token`, `expires_in`, `user_id`, ...).
+
+        """
+        key = hashlib.sha256(refresh_token.encode()).digest()
+        return self.flight.do(key, self._refresh, refresh_token)
+
+    def _refresh(self, refresh_token):
+        try:
+            with metrics.timed('securetoken.upstream'):
+                response = self.session.post(
+                    f'{self.url}/v1/token',
+                    params={'key': self.api_key},
+                    data={'grant_type': 'refresh_token', 'refresh_token': refresh_token},
+                    timeout=self.timeout,
+                )
+        except requests.RequestException as e:
+            metrics.increment('securetoken.errors')
+            raise SecureTokenError(f'Could not reach the securetoken service: {e}')
+        if response.status_code != 200:
+            metrics.increment('securetoken.rejected')
+            try:
+                message = response.json()['error']['message']
+            except (ValueError, KeyError, TypeError):
+                message = response.text
+            raise SecureTokenError(message, status_code=response.status_code)
+        try:
+            tokens = response.json()
+        except ValueError:
+            tokens = None
+        if not isinstance(tokens, dict) or 'id_token' not in tokens:
+            metrics.increment('securetoken.errors')
+            raise SecureTokenError('The securetoken service returned an unexpected response.')
+        return tokens
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_securetoken_client():
+    """
+    Return the process-wide client configured by the `FIREBASE_SECURETOKEN` setting.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                config = dict(DEFAULTS, **getattr(settings, 'FIREBASE_SECURETOKEN', {}))
+                _client = SecureTokenClient(config['URL'], config['API_KEY'], config['POOL_SIZE'], config['TIMEOUT'])
+    return _client
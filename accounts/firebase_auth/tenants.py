@@ -0,0 +1,284 @@
+import base64
+import json
+import threading
+from collections import OrderedDict
+
+import firebase_admin
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from firebase_admin import auth, credentials
+
+from accounts.utils.single_flight import SingleFlight
+from .revocation import RevocationCache, revocation_cache
+from .token_cache import VerifiedTokenCache
+
+
+DEFAULTS = {
+    'ENABLED': False,
+    # project id -> {'CREDENTIALS_PATH': ..., 'TENANTS': [...] or '*', 'HOSTS': {host: tenant id or None}}
+    'PROJECTS': {},
+    # tenant clients kept initialized; the least recently used is dropped, with its caches, beyond this
+    'MAX_TENANTS': 32,
+    'TOKEN_CACHE_MAX_ENTRIES': 2000,
+    'TOKEN_CACHE_TTL': 300,
+    'REVOCATION_MAX_ENTRIES': 10000,
+    # create the User of another project's or tenant's verified token on its first request;
+    # when off, those users must be created with firebase_project_id and firebase_tenant_id set
+    'PROVISION_USERS': False,
+}
+
+
+class UnknownTenant(ValueError):
+    """
+    Raised when a token or host belongs to a Firebase project or tenant this deployment does not serve.
+    """
+
+
+def unverified_claims(id_token):
+    """
+    Decode the payload of a JWT without checking it; only used to pick the client that verifies it.
+    """
+    try:
+        payload = id_token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return {}
+    return claims if isinstance(claims, dict) else {}
+
+
+class FirebaseTenant:
+    """
+    Verification state for one Firebase project, or one Identity Platform tenant of it.
+
+    Each tenant has its own auth client (which checks the token's audience and tenant and
+    keeps its own certificate cache), verified-token cache, revocation cache and
+    single-flight group, so a burst of traffic on one tenant cannot evict another's entries.
+
+    Attributes:
+    - `project_id` (str): The Firebase project.
+    - `tenant_id` (str): The Identity Platform tenant, or None for the project itself.
+    - `auth` (auth.Client): Client scoped to the project and tenant.
+
+    """
+
+    def __init__(self, app, tenant_id, config):
+        self.project_id = app.project_id
+        self.tenant_id = tenant_id
+        self.auth = auth.Client(app, tenant_id=tenant_id)
+        self.token_cache = VerifiedTokenCache(config['TOKEN_CACHE_MAX_ENTRIES'], config['TOKEN_CACHE_TTL'])
+        self.revocation_cache = RevocationCache(auth_client=self.auth, max_entries=config['REVOCATION_MAX_ENTRIES'])
+        self.flight = SingleFlight(f'token_verification:{self.project_id}:{tenant_id or ""}')
+
+    def verify_id_token(self, id_token):
+        decoded_token = self.token_cache.get(id_token)
+        if decoded_token is None:
+            decoded_token = self.flight.do(id_token, self._verify_and_cache, id_token)
+        return decoded_token
+
+    def _verify_and_cache(self, id_token):
+        decoded_token = self.auth.verify_id_token(id_token)
+        self.token_cache.set(id_token, decoded_token)
+        return decoded_token
+
+    def close(self):
+        self.revocation_cache.close()
+
+    def stats(self):
+        return {
+            'token_cache': self.token_cache.stats(),
+            'revocation': self.revocation_cache.stats(),
+        }
+
+
+class FirebaseTenantRegistry:
+    """
+    Resolve the Firebase project and tenant a request belongs to, and its verification client.
+
+    The request host is looked up in the `HOSTS` of each configured project first; otherwise
+    the token's `aud` (project) and `firebase.tenant` claims are used. Tokens of the default
+    project without a tenant keep the module-level default path. Firebase apps are created
+    once per configured project on first use; tenant clients are created on first use and
+    at most `MAX_TENANTS` are kept.
+
+    Methods:
+    - `resolve`: The tenant for a token and host, or None for the default project.
+    - `revocation_cache_for`: The revocation cache that applies to a decoded token.
+    - `user_scope`: The project and tenant a decoded token's uid belongs to.
+    - `user_filter`: `User` lookup arguments for a decoded token's uid.
+    - `provision_user`: Create the user of a verified token from another project or tenant.
+    - `get`: The tenant for a project and tenant id.
+    - `stats`: Per-tenant cache counters.
+
+    """
+
+    def __init__(self):
+        self._tenants = OrderedDict()
+        self._apps = {}
+        self._lock = threading.Lock()
+        self._hosts = None
+
+    @property
+    def config(self):
+        return dict(DEFAULTS, **getattr(settings, 'FIREBASE_TENANTS', {}))
+
+    @property
+    def enabled(self):
+        return self.config['ENABLED']
+
+    def resolve(self, id_token, host=None):
+        config = self.config
+        if not config['ENABLED']:
+            return None
+        if host:
+            target = self._host_map(config).get(host.split(':')[0].lower())
+            if target is not None:
+                return self.get(*target)
+        claims = unverified_claims(id_token)
+        firebase_claims = claims.get('firebase')
+        tenant_id = firebase_claims.get('tenant') if isinstance(firebase_claims, dict) else None
+        return self.get(claims.get('aud'), tenant_id)
+
+    def revocation_cache_for(self, decoded_token):
+        if not self.enabled:
+            return revocation_cache
+        firebase_claims = decoded_token.get('firebase')
+        tenant_id = firebase_claims.get('tenant') if isinstance(firebase_claims, dict) else None
+        tenant = self.get(decoded_token.get('aud'), tenant_id)
+        return revocation_cache if tenant is None else tenant.revocation_cache
+
+    def user_scope(self, decoded_token):
+        """
+        Return the project and tenant a decoded token's uid belongs to, as stored on `User`.
+
+        The same uid can exist in several projects and tenants, so users are looked up by all
+        three. The default project is stored as None, so that users created before tenants
+        were configured keep matching.
+
+        Returns:
+        - tuple: `(firebase_project_id, firebase_tenant_id)`.
+
+        """
+        firebase_claims = decoded_token.get('firebase')
+        tenant_id = firebase_claims.get('tenant') if isinstance(firebase_claims, dict) else None
+        project_id = decoded_token.get('aud') if self.enabled else None
+        if project_id is not None and project_id == self._default_app().project_id:
+            project_id = None
+        return project_id, tenant_id
+
+    def user_filter(self, decoded_token):
+        project_id, tenant_id = self.user_scope(decoded_token)
+        return {
+            'firebase_uid': decoded_token.get('uid'),
+            'firebase_project_id': project_id,
+            'firebase_tenant_id': tenant_id,
+        }
+
+    def provision_user(self, decoded_token):
+        """
+        Create the user of a verified token from another project or tenant, when `PROVISION_USERS` is on.
+
+        Users of the default project sign up through `auth/sign-up/` and are never created here.
+        Emails are unique across every project, so a token whose email already belongs to
+        another user gets no user.
+
+        Returns:
+        - User: The new user, or the one a concurrent request just created.
+        - None: When nothing was created.
+
+        """
+        config = self.config
+        email = decoded_token.get('email')
+        if not config['ENABLED'] or not config['PROVISION_USERS'] or not email or not decoded_token.get('email_verified'):
+            return None
+        user_filter = self.user_filter(decoded_token)
+        if user_filter['firebase_project_id'] is None and user_filter['firebase_tenant_id'] is None:
+            return None
+
+        from accounts.models import User
+        # a user pending deletion, or otherwise already recorded, is not created again
+        if User.objects.filter(**user_filter).exists():
+            return None
+        user = User(email=email, is_active=True, **user_filter)
+        user.set_unusable_password()
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
+            return User.objects.filter(email=email, pending_deletion=False, **user_filter).first()
+        return user
+
+    def get(self, project_id, tenant_id=None):
+        """
+        Return the tenant for `project_id` and `tenant_id`, initializing it on first use.
+
+        Returns:
+        - FirebaseTenant: The tenant, or None for the default project without a tenant.
+
+        Raises:
+        - UnknownTenant: When the project or tenant is not configured.
+
+        """
+        key = (project_id, tenant_id)
+        with self._lock:
+            tenant = self._tenants.get(key)
+            if tenant is not None:
+                self._tenants.move_to_end(key)
+                return tenant
+
+        config = self.config
+        default_project_id = self._default_app().project_id
+        if project_id == default_project_id and tenant_id is None:
+            return None
+        project = config['PROJECTS'].get(project_id)
+        if project is None and project_id != default_project_id:
+            raise UnknownTenant(f"Firebase project {project_id} is not served by this deployment.")
+        allowed_tenants = (project or {}).get('TENANTS', ())
+        if tenant_id is not None and allowed_tenants != '*' and tenant_id not in allowed_tenants:
+            raise UnknownTenant(f"Tenant {tenant_id} of firebase project {project_id} is not served by this deployment.")
+
+        with self._lock:
+            tenant = self._tenants.get(key)
+            if tenant is None:
+                tenant = FirebaseTenant(self._get_app(project_id, project, default_project_id), tenant_id, config)
+                self._tenants[key] = tenant
+                while len(self._tenants) > config['MAX_TENANTS']:
+                    _, evicted = self._tenants.popitem(last=False)
+                    evicted.close()
+            self._tenants.move_to_end(key)
+            return tenant
+
+    def stats(self):
+        with self._lock:
+            tenants = list(self._tenants.items())
+        return {f'{project_id}/{tenant_id or "-"}': tenant.stats() for (project_id, tenant_id), tenant in tenants}
+
+    def _get_app(self, project_id, project, default_project_id):
+        # called with the lock held; one app per project, shared by its tenants
+        if project_id == default_project_id:
+            return self._default_app()
+        app = self._apps.get(project_id)
+        if app is None:
+            cred = credentials.Certificate(project['CREDENTIALS_PATH'])
+            app = self._apps[project_id] = firebase_admin.initialize_app(
+                cred, options={'projectId': project_id}, name=project_id,
+            )
+        return app
+
+    @staticmethod
+    def _default_app():
+        # initialized from FIREBASE_ADMIN_SDK_CREDENTIALS_PATH when the authentication module is imported
+        from .firebase_authentication import default_app
+        return default_app
+
+    def _host_map(self, config):
+        projects = config['PROJECTS']
+        if self._hosts is None or self._hosts[0] is not projects:
+            self._hosts = (projects, {
+                host.lower(): (project_id, tenant_id)
+                for project_id, project in projects.items()
+                for host, tenant_id in project.get('HOSTS', {}).items()
+            })
+        return self._hosts[1]
+
+
+firebase_tenants = FirebaseTenantRegistry()
@@ -0,0 +1,56 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifiedTokenCache:
+    """
+    Bounded cache of verified Firebase ID tokens, keyed by a digest of the token.
+
+    An entry is served until the earlier of the token's `exp` and `ttl` seconds after it
+    was verified, so an expired token is never returned. Revocation is checked separately
+    on every request by `accounts.firebase_auth.revocation`.
+
+    Methods:
+    - `get`: Return the decoded claims of a cached token, or None.
+    - `set`: Cache the decoded claims of a verified token.
+    - `stats`: Hit and miss counters.
+
+    """
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def _key(id_token):
+        return hashlib.sha256(id_token.encode()).digest()
+
+    def get(self, id_token):
+        key = self._key(id_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                decoded_token, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return decoded_token
+                del self._entries[key]
+            self._counters['misses'] += 1
+        return None
+
+    def set(self, id_token, decoded_token):
+        expires_at = min(decoded_token.get('exp', 0), time.time() + self.ttl)
+        with self._lock:
+            self._entries[self._key(id_token)] = (decoded_token, expires_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries))
@@ -0,0 +1,129 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    check_password,
+    make_password,
+)
+from django.core.exceptions import ImproperlyConfigured
+
+
+# Firebase is the source of truth for credentials; the local User.password is only a mirror of it.
+DEFAULT = 'default'
+PBKDF2 = 'pbkdf2'
+ARGON2 = 'argon2'
+UNUSABLE = 'unusable'
+PROFILES = (DEFAULT, PBKDF2, ARGON2, UNUSABLE)
+
+DEFAULTS = {
+    'PROFILE': DEFAULT,
+    'PBKDF2_ITERATIONS': 10000,
+    'ARGON2_TIME_COST': 1,
+    'ARGON2_MEMORY_COST': 8192,
+    'ARGON2_PARALLELISM': 1,
+}
+
+
+def get_mirror_password_config():
+    config = dict(DEFAULTS, **getattr(settings, 'MIRROR_PASSWORD', {}))
+    if config['PROFILE'] not in PROFILES:
+        raise ImproperlyConfigured(f"MIRROR_PASSWORD['PROFILE'] must be one of {PROFILES}.")
+    return config
+
+
+class MirrorPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 with a reduced, configurable iteration count for mirror-only passwords.
+    """
+    algorithm = 'pbkdf2_sha256_mirror'
+
+    @property
+    def iterations(self):
+        return get_mirror_password_config()['PBKDF2_ITERATIONS']
+
+
+class MirrorArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with configurable time and memory cost for mirror-only passwords.
+
+    Requires the optional argon2-cffi package.
+    """
+    algorithm = 'argon2mirror'
+
+    @property
+    def time_cost(self):
+        return get_mirror_password_config()['ARGON2_TIME_COST']
+
+    @property
+    def memory_cost(self):
+        return get_mirror_password_config()['ARGON2_MEMORY_COST']
+
+    @property
+    def parallelism(self):
+        return get_mirror_password_config()['ARGON2_PARALLELISM']
+
+
+MIRROR_HASHERS = {
+    PBKDF2: MirrorPBKDF2PasswordHasher.algorithm,
+    ARGON2: MirrorArgon2PasswordHasher.algorithm,
+}
+
+
+def _uses_full_strength_hash(user, profile):
+    # staff and superusers sign in to the admin with the local password, so theirs is never a mirror
+    return profile == DEFAULT or user.is_staff or user.is_superuser
+
+
+def set_mirror_password(user, raw_password):
+    """
+    Store `raw_password` on `user` according to the deployment's mirror password profile.
+
+    Args:
+    - `user` (User): The user whose password is being set; not saved.
+    - `raw_password` (str): The plain text password.
+
+    """
+    profile = get_mirror_password_config()['PROFILE']
+    if _uses_full_strength_hash(user, profile):
+        user.set_password(raw_password)
+    elif profile == UNUSABLE:
+        user.set_unusable_password()
+    else:
+        user.password = make_password(raw_password, hasher=MIRROR_HASHERS[profile])
+
+
+def sync_mirror_password(user, raw_password):
+    """
+    Bring the mirrored password in line with a password Firebase has just accepted.
+
+    The stored hash is replaced when it does not match, and upgraded to the current
+    profile when it was made by another hasher or with other cost parameters.
+
+    Returns:
+    - bool: True when the user was saved.
+
+    """
+    profile = get_mirror_password_config()['PROFILE']
+    if _uses_full_strength_hash(user, profile):
+        preferred = DEFAULT
+    elif profile == UNUSABLE:
+        if not user.has_usable_password():
+            return False
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+        return True
+    else:
+        preferred = MIRROR_HASHERS[profile]
+
+    upgraded = []
+
+    def setter(password):
+        set_mirror_password(user, password)
+        upgraded.append(True)
+
+    if not user.has_usable_password() or not check_password(raw_password, user.password, setter, preferred):
+        set_mirror_password(user, raw_password)
+    elif not upgraded:
+        return False
+    user.save(update_fields=['password'])
+    return True
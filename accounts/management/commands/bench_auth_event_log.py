@@ -0,0 +1,64 @@
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import AuthEvent
+from accounts.utils.auth_event_log import AuthEventLog, DatabaseSink, JsonlFileSink
+
+
+class Command(BaseCommand):
+    help = "Benchmark the per-request cost of recording auth events against synchronous inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=20000, help='Number of events to record.')
+
+    def handle(self, *args, **options):
+        count = options['events']
+
+        def event(i):
+            return {
+                'event_type': AuthEvent.SIGN_IN,
+                'success': True,
+                'email': f'user{i}@example.com',
+                'firebase_uid': f'uid-{i}',
+                'ip_address': '127.0.0.1',
+                'user_agent': 'bench',
+                'metadata': {},
+                'created_at': timezone.now(),
+            }
+
+        # synchronous insert on the request path, rolled back so the bench leaves no rows behind
+        sync_count = min(count, 2000)
+        with transaction.atomic():
+            started = time.perf_counter()
+            for i in range(sync_count):
+                AuthEvent.objects.create(**event(i))
+            sync_cost = (time.perf_counter() - started) / sync_count
+            transaction.set_rollback(True)
+        self.stdout.write(f"synchronous insert: {sync_cost * 1e6:.1f} us per event")
+
+        with tempfile.TemporaryDirectory() as directory:
+            sinks = (
+                ('jsonl', JsonlFileSink(str(Path(directory) / 'events.jsonl'), 10 * 1024 * 1024, 3)),
+                ('database', DatabaseSink()),
+            )
+            for label, sink in sinks:
+                with transaction.atomic():
+                    log = AuthEventLog(sink, queue_size=count, flush_interval=3600)
+                    started = time.perf_counter()
+                    for i in range(count):
+                        log.record(event(i))
+                    record_cost = (time.perf_counter() - started) / count
+                    started = time.perf_counter()
+                    log.flush()
+                    flush_rate = count / (time.perf_counter() - started)
+                    transaction.set_rollback(True)
+                self.stdout.write(
+                    f"queued ({label}): {record_cost * 1e6:.1f} us per event on the request path, "
+                    f"background flush {flush_rate:,.0f} events/s, counters {log.stats()}"
+                )
+                sink.close()
@@ -0,0 +1,75 @@
+import hashlib
+import os
+import random
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from accounts.validators import BreachedPasswordIndex
+
+
+def resident_memory():
+    """
+    Return the process's anonymous (private) and file-backed (shareable) resident memory, in KiB.
+    """
+    fields = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('RssAnon', 'RssFile'):
+                fields[name] = int(value.split()[0])
+    return fields.get('RssAnon', 0), fields.get('RssFile', 0)
+
+
+class Command(BaseCommand):
+    help = "Benchmark breached password lookups in the mmap index against an in-memory set: latency and RSS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=1_000_000)
+        parser.add_argument('--lookups', type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        entries, lookups = options['entries'], options['lookups']
+        breached = [f'breached-{i}' for i in range(entries)]
+
+        with tempfile.TemporaryDirectory() as workdir:
+            source = os.path.join(workdir, 'source.txt')
+            with open(source, 'w') as f:
+                for password in breached:
+                    f.write(f'{hashlib.sha1(password.encode()).hexdigest().upper()}:1\n')
+            path = os.path.join(workdir, 'breached.idx')
+            call_command('compile_breached_passwords', source, output=path, stdout=open(os.devnull, 'w'))
+
+            hits = random.sample(breached, min(lookups, entries))
+            misses = [f'not-breached-{i}' for i in range(lookups)]
+
+            anon_before, file_before = resident_memory()
+            index = BreachedPasswordIndex(path)
+            assert all(index.contains_password(password) for password in hits[:1000])
+            assert not any(index.contains_password(password) for password in misses[:1000])
+            for label, passwords in (('hit', hits), ('miss', misses)):
+                started = time.perf_counter()
+                for password in passwords:
+                    index.contains_password(password)
+                elapsed = (time.perf_counter() - started) / len(passwords)
+                self.stdout.write(f"mmap index {label:>4}: {elapsed * 1e6:.2f} us per lookup")
+            anon_after, file_after = resident_memory()
+            self.stdout.write(
+                f"mmap index: {os.path.getsize(path) / 1024 / 1024:.1f} MiB file, "
+                f"+{anon_after - anon_before} KiB private RSS, +{file_after - file_before} KiB shared page cache RSS"
+            )
+            index.close()
+
+            anon_before, _ = resident_memory()
+            digests = {hashlib.sha1(password.encode()).digest() for password in breached}
+            started = time.perf_counter()
+            for password in misses:
+                hashlib.sha1(password.encode()).digest() in digests
+            elapsed = (time.perf_counter() - started) / len(misses)
+            anon_after, _ = resident_memory()
+            self.stdout.write(
+                f"  python set miss: {elapsed * 1e6:.2f} us per lookup, "
+                f"+{anon_after - anon_before} KiB private RSS in every worker"
+            )
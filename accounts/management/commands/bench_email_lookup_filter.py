@@ -0,0 +1,39 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from accounts.utils.email_lookup_filter import BloomFilter
+
+
+class Command(BaseCommand):
+    help = "Benchmark the email lookup Bloom filter: memory footprint, lookup cost and measured false-positive rate."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000, help='Number of existing emails.')
+        parser.add_argument('--probes', type=int, default=100000, help='Number of unknown emails to look up.')
+        parser.add_argument('--false-positive-rate', type=float, default=0.01)
+
+    def handle(self, *args, **options):
+        users = options['users']
+        probes = options['probes']
+
+        tracemalloc.start()
+        bloom = BloomFilter(users, options['false_positive_rate'])
+        for i in range(users):
+            bloom.add(f'user{i}@example.com')
+        memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        false_positives = sum(f'stranger{i}@example.com' in bloom for i in range(probes))
+        lookup_cost = (time.perf_counter() - started) / probes
+
+        self.stdout.write(
+            f"{users:,} emails in {bloom.nbytes / 1024 / 1024:.2f} MiB ({bloom.size:,} bits, {bloom.hash_count} hashes, "
+            f"peak traced {memory / 1024 / 1024:.2f} MiB)"
+        )
+        self.stdout.write(
+            f"lookup {lookup_cost * 1e6:.2f} us; false positives {false_positives / probes:.4%} "
+            f"(expected {bloom.expected_false_positive_rate():.4%})"
+        )
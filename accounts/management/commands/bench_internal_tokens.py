@@ -0,0 +1,56 @@
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from google.auth import crypt, jwt
+
+from accounts.firebase_auth.internal_tokens import mint_internal_token, verify_internal_token
+from accounts.firebase_auth.token_cache import VerifiedTokenCache
+
+
+class Command(BaseCommand):
+    help = "Benchmark internal token verification against RS256 verification of a Firebase-style ID token."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        now = int(time.time())
+        claims = {
+            'iss': 'https://securetoken.google.com/bench', 'aud': 'bench', 'sub': 'bench-uid', 'uid': 'bench-uid',
+            'email': 'bench@example.com', 'email_verified': True, 'iat': now, 'exp': now + 3600,
+            'auth_time': now, 'is_staff': True, 'roles': ['support'],
+        }
+
+        # an RS256 token checked the way firebase_admin does once the signing certificates are fetched
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+        )
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        id_token = jwt.encode(crypt.RSASigner.from_string(private_pem, 'bench-key'), claims).decode()
+        certs = {'bench-key': public_pem}
+
+        token_cache = VerifiedTokenCache()
+        token_cache.set(id_token, claims)
+
+        with override_settings(INTERNAL_TOKENS={'KEYS': {'bench': 'bench-secret'}, 'ACTIVE_KEY': 'bench'}):
+            internal_token, _ = mint_internal_token(claims, user_id='00000000-0000-0000-0000-000000000000')
+            cases = {
+                'firebase RS256 verify': lambda: jwt.decode(id_token, certs=certs, audience='bench'),
+                'verified-token cache hit': lambda: token_cache.get(id_token),
+                'internal HMAC verify': lambda: verify_internal_token(internal_token),
+            }
+            self.stdout.write(f"firebase ID token: {len(id_token)} bytes, internal token: {len(internal_token)} bytes")
+            for label, verify in cases.items():
+                verify()
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    verify()
+                elapsed = (time.perf_counter() - started) / iterations
+                self.stdout.write(f"{label:>26}: {elapsed * 1e6:.1f} us")
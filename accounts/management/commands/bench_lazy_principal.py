@@ -0,0 +1,52 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.firebase_auth.firebase_authentication import FirebaseAuthentication
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = "Benchmark allocations and queries per request for the lazy principal against an eager User fetch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        decoded_token = {'uid': 'bench-principal', 'email': 'principal@example.com', 'email_verified': True}
+        authentication = FirebaseAuthentication()
+
+        with transaction.atomic():
+            User.objects.create(email=decoded_token['email'], firebase_uid=decoded_token['uid'])
+
+            for label, lazy in (('eager User', False), ('lazy principal', True)):
+                with override_settings(FIREBASE_AUTH_LAZY_USER=lazy):
+                    # a handler that only needs what the token already carries
+                    def handle_request():
+                        user = authentication.get_user(decoded_token)
+                        return user.firebase_uid, user.email
+
+                    # steady state: the lazy principal's account check is cached after the first request
+                    handle_request()
+                    with CaptureQueriesContext(connection) as queries:
+                        handle_request()
+                    tracemalloc.start()
+                    for _ in range(count):
+                        handle_request()
+                    allocated = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    started = time.perf_counter()
+                    for _ in range(count):
+                        handle_request()
+                    elapsed = (time.perf_counter() - started) / count
+
+                self.stdout.write(
+                    f"{label:>14}: {len(queries)} queries, {elapsed * 1e6:.1f} us, "
+                    f"peak traced {allocated / 1024:.1f} KiB over {count} requests"
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from accounts.hashers import ARGON2, DEFAULT, PBKDF2, UNUSABLE, get_mirror_password_config, set_mirror_password, sync_mirror_password
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = "Benchmark CPU time per sign-up and sign-in for each mirror password profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        password = 'Mirror-Passw0rd!'
+
+        for profile in (DEFAULT, PBKDF2, ARGON2, UNUSABLE):
+            with override_settings(MIRROR_PASSWORD=dict(get_mirror_password_config(), PROFILE=profile)):
+                user = User(email='bench@example.com')
+                try:
+                    started = time.process_time()
+                    for _ in range(rounds):
+                        set_mirror_password(user, password)
+                    sign_up = (time.process_time() - started) / rounds
+                except ValueError as e:
+                    self.stdout.write(f"{profile:>8}: skipped ({e})")
+                    continue
+
+                # sign-in verifies the mirror against the password firebase accepted; save() is a no-op here
+                user.save = lambda **kwargs: None
+                started = time.process_time()
+                for _ in range(rounds):
+                    sync_mirror_password(user, password)
+                sign_in = (time.process_time() - started) / rounds
+
+            self.stdout.write(f"{profile:>8}: sign-up {sign_up * 1000:.2f} ms CPU, sign-in {sign_in * 1000:.2f} ms CPU")
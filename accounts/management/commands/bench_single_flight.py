@@ -0,0 +1,109 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+from accounts.firebase_auth import firebase_authentication
+from accounts.firebase_auth.firebase_authentication import FirebaseAuthentication
+from accounts.models import User
+from accounts.utils.single_flight import SingleFlight
+
+
+class _Direct:
+    """
+    Stands in for a SingleFlight and runs every call, for the uncoalesced baseline.
+    """
+
+    def do(self, key, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+    def stats(self):
+        return {}
+
+
+class Command(BaseCommand):
+    help = ("Benchmark bursts of concurrent requests sharing one token through FirebaseAuthentication, "
+            "with and without single-flight coalescing of the verification and the user lookup.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', type=int, default=50, help='Concurrent requests per burst.')
+        parser.add_argument('--bursts', type=int, default=20, help='Number of bursts.')
+        parser.add_argument('--latency-ms', type=float, default=20.0, help='Simulated RS256 verification latency.')
+
+    def handle(self, *args, **options):
+        burst = options['burst']
+        bursts = options['bursts']
+        latency = options['latency_ms'] / 1000
+
+        executions = {'verifications': 0, 'lookups': 0}
+        lock = threading.Lock()
+        factory = RequestFactory()
+        uid = 'bench-single-flight'
+
+        # stands in for firebase_admin's verify_id_token; the cost is paid per execution
+        def verify(id_token):
+            with lock:
+                executions['verifications'] += 1
+            time.sleep(latency)
+            return {'uid': uid, 'email': 'single-flight@example.com', 'email_verified': True, 'token': id_token}
+
+        fetch_user_row = firebase_authentication._fetch_user_row
+
+        def fetch_row(uid, project_id=None, tenant_id=None):
+            with lock:
+                executions['lookups'] += 1
+            return fetch_user_row(uid, project_id, tenant_id)
+
+        # the request threads use their own connections, so the user is committed and removed afterwards
+        user = User.objects.create(email='single-flight@example.com', firebase_uid=uid)
+        try:
+            settings_override = override_settings(
+                FIREBASE_AUTH_LAZY_USER=False,
+                FIREBASE_TOKEN_CACHE={'ENABLED': False},
+                FIREBASE_REVOCATION_CHECK={'ENABLED': False},
+            )
+            with settings_override, \
+                    mock.patch.object(firebase_authentication.auth, 'verify_id_token', verify), \
+                    mock.patch.object(firebase_authentication, '_fetch_user_row', fetch_row):
+                for label, coalesce in (('direct', False), ('coalesced', True)):
+                    self.run_bursts(label, coalesce, burst, bursts, factory, executions)
+        finally:
+            user.delete()
+
+    def run_bursts(self, label, coalesce, burst, bursts, factory, executions):
+        verification_flight = SingleFlight('bench_token_verification') if coalesce else _Direct()
+        lookup_flight = SingleFlight('bench_user_lookup') if coalesce else _Direct()
+        executions.update(verifications=0, lookups=0)
+        with mock.patch.object(firebase_authentication, 'token_verification_flight', verification_flight), \
+                mock.patch.object(firebase_authentication, 'user_lookup_flight', lookup_flight):
+            started = time.perf_counter()
+            for i in range(bursts):
+                request = factory.get('/', HTTP_AUTHORIZATION=f'Bearer token-{i}')
+                barrier = threading.Barrier(burst)
+                users = []
+
+                def handle_request():
+                    try:
+                        barrier.wait()
+                        users.append(FirebaseAuthentication().authenticate(request)[0])
+                    finally:
+                        connection.close()
+
+                threads = [threading.Thread(target=handle_request) for _ in range(burst)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                assert len(users) == burst, f"{burst - len(users)} requests failed to authenticate"
+                assert len({id(user) for user in users}) == len(users), "coalesced requests shared a User instance"
+            elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{label:>9}: {bursts * burst} requests, {executions['verifications']} verifications, "
+            f"{executions['lookups']} user lookups, {elapsed * 1000 / bursts:.1f} ms per burst"
+        )
+        if coalesce:
+            self.stdout.write(f"           counters: {verification_flight.stats()} {lookup_flight.stats()}")
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import User
+from accounts.serializers import UserSerializer, UserReadSerializer
+
+
+class Command(BaseCommand):
+    help = "Benchmark UserSerializer against the fast UserReadSerializer at 1 row and 10k rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=2000, help='Repetitions of the single row case.')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+
+        with transaction.atomic():
+            User.objects.bulk_create(
+                User(email=f'bench{i}@example.com', firebase_uid=f'bench-serializer-{i}',
+                     first_name='Bench', last_name=str(i))
+                for i in range(rows)
+            )
+            queryset = User.objects.filter(firebase_uid__startswith='bench-serializer-').order_by('pk')
+            user = queryset.first()
+            user_row = queryset.values(*UserReadSerializer.fields).first()
+
+            expected = [dict(row) for row in UserSerializer(queryset, many=True).data]
+            if UserReadSerializer(queryset, many=True).data != expected:
+                raise CommandError("UserReadSerializer output differs from UserSerializer.")
+            if UserReadSerializer(user_row).data != dict(UserSerializer(user).data):
+                raise CommandError("UserReadSerializer output differs from UserSerializer.")
+
+            self.report('1 row', repeat, {
+                'UserSerializer': lambda: UserSerializer(user).data,
+                'UserReadSerializer (instance)': lambda: UserReadSerializer(user).data,
+                'UserReadSerializer (values)': lambda: UserReadSerializer(user_row).data,
+            })
+            # the many=True cases include fetching the rows
+            self.report(f'{rows} rows', 1, {
+                'UserSerializer': lambda: UserSerializer(queryset.all(), many=True).data,
+                'UserReadSerializer (values)': lambda: UserReadSerializer(queryset.all(), many=True).data,
+            })
+            transaction.set_rollback(True)
+
+    def report(self, label, repeat, cases):
+        self.stdout.write(label)
+        for name, serialize in cases.items():
+            serialize()
+            started = time.perf_counter()
+            for _ in range(repeat):
+                serialize()
+            elapsed = (time.perf_counter() - started) / repeat
+            self.stdout.write(f"  {name:>30}: {elapsed * 1e6:.1f} us")
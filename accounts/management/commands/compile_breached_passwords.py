@@ -0,0 +1,121 @@
+import hashlib
+import heapq
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.validators import FANOUT, FANOUT_ENTRIES, HEADER, MAGIC, get_breached_passwords_config
+
+
+class Command(BaseCommand):
+    help = ("Compile a breached password list (e.g. the Pwned Passwords SHA-1 file, one `HASH[:count]` per line) "
+            "into the sorted, memory-mapped index read by BreachedPasswordValidator.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Source list, one SHA-1 hex digest (optionally `:count`) per line.')
+        parser.add_argument('--output', help='Index file to write (default: BREACHED_PASSWORDS PATH).')
+        parser.add_argument('--plaintext', action='store_true', help='The source lists passwords, not digests.')
+        parser.add_argument('--prefix-bytes', type=int, default=8,
+                            help='Digest bytes kept per entry; 8 keeps false positives negligible at a billion entries.')
+        parser.add_argument('--min-count', type=int, default=0, help='Skip digests seen fewer times than this.')
+        parser.add_argument('--chunk-size', type=int, default=5_000_000, help='Digests sorted in memory at a time.')
+
+    def handle(self, *args, **options):
+        output = options['output'] or get_breached_passwords_config()['PATH']
+        if not output:
+            raise CommandError("Pass --output or set BREACHED_PASSWORDS PATH.")
+        width = options['prefix_bytes']
+        if not 2 <= width <= 20:
+            raise CommandError("--prefix-bytes must be between 2 and 20.")
+
+        self.malformed = 0
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output))) as workdir:
+            runs = self.write_sorted_runs(options, width, workdir)
+            if self.malformed:
+                self.stderr.write(f"Skipped {self.malformed} malformed lines")
+            self.stdout.write(f"Merging {len(runs)} sorted runs")
+            count = self.merge_runs(runs, width, output)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} digests to {output} ({os.path.getsize(output) / 1024 / 1024:.1f} MiB)"
+        ))
+
+    def parse(self, line, options):
+        if options['plaintext']:
+            # whitespace around a password is part of it; only the line ending is not
+            password = line.rstrip('\r\n')
+            return hashlib.sha1(password.encode('utf-8')).digest() if password else None
+        line = line.strip()
+        if not line:
+            return None
+        digest, _, count = line.partition(':')
+        try:
+            digest = bytes.fromhex(digest)
+            count = int(count) if count else None
+        except ValueError:
+            digest = None
+        if digest is None or len(digest) != 20:
+            self.malformed += 1
+            return None
+        if options['min_count'] and count is not None and count < options['min_count']:
+            return None
+        return digest
+
+    def write_sorted_runs(self, options, width, workdir):
+        # external sort: the source may not fit in memory, so it is cut into sorted runs merged afterwards
+        runs, chunk = [], []
+        with open(options['input'], encoding='utf-8', errors='replace') as source:
+            for line in source:
+                digest = self.parse(line, options)
+                if digest is None:
+                    continue
+                chunk.append(digest[:width])
+                if len(chunk) >= options['chunk_size']:
+                    runs.append(self.write_run(chunk, workdir, len(runs)))
+                    chunk = []
+        if chunk:
+            runs.append(self.write_run(chunk, workdir, len(runs)))
+        return runs
+
+    def write_run(self, chunk, workdir, number):
+        chunk.sort()
+        path = os.path.join(workdir, f'run-{number}')
+        with open(path, 'wb') as f:
+            f.write(b''.join(chunk))
+        return path
+
+    def read_run(self, path, width):
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(width * 65536)
+                if not block:
+                    return
+                for start in range(0, len(block), width):
+                    yield block[start:start + width]
+
+    def merge_runs(self, runs, width, output):
+        fanout = [0] * FANOUT_ENTRIES
+        count, previous = 0, None
+        partial = f'{output}.partial'
+        with open(partial, 'wb') as f:
+            f.seek(HEADER.size + FANOUT.size)
+            buffer = []
+            for prefix in heapq.merge(*(self.read_run(path, width) for path in runs)):
+                if prefix == previous:
+                    continue
+                previous = prefix
+                fanout[((prefix[0] << 8) | prefix[1]) + 1] += 1
+                buffer.append(prefix)
+                count += 1
+                if len(buffer) >= 65536:
+                    f.write(b''.join(buffer))
+                    buffer = []
+            f.write(b''.join(buffer))
+            for bucket in range(1, FANOUT_ENTRIES):
+                fanout[bucket] += fanout[bucket - 1]
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, count, width))
+            f.write(FANOUT.pack(*fanout))
+        # workers that already mapped the previous index keep reading it until they reopen
+        os.replace(partial, output)
+        return count
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.firebase_auth.revocation import revocation_cache, ALWAYS_REVOKED
+from accounts.models import User
+from accounts.utils.emails import normalize_lookup_email
+from accounts.utils.user_deletion import delete_pending_users, process_pending_deletions
+
+
+class Command(BaseCommand):
+    help = "Mark users for deletion (e.g. a GDPR erasure batch) and delete them from firebase and the database in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='File with one firebase uid or email per line.')
+        parser.add_argument('--pending-only', action='store_true', help='Only process users already pending deletion.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Uids per auth.delete_users call (max 1000).')
+        parser.add_argument('--background', action='store_true', help='Hand the batches to the celery worker.')
+
+    def handle(self, *args, **options):
+        if options['file']:
+            with open(options['file']) as f:
+                identifiers = [line.strip() for line in f if line.strip()]
+            self.mark_pending(identifiers)
+        elif not options['pending_only']:
+            raise CommandError("Pass --file with the users to delete, or --pending-only.")
+
+        if options['background']:
+            result = delete_pending_users.delay(options['batch_size'])
+            self.stdout.write(f"Scheduled task {result.id}")
+            return
+
+        totals = process_pending_deletions(
+            options['batch_size'],
+            progress=lambda t: self.stdout.write(
+                f"{t['processed']}/{t['total']} processed, {t['deleted']} deleted, {t['failed']} failed"
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Done: {totals}"))
+
+    def mark_pending(self, identifiers):
+        emails = [normalize_lookup_email(value) for value in identifiers if '@' in value]
+        uids = [value for value in identifiers if '@' not in value]
+        marked = 0
+        for start in range(0, len(identifiers), 1000):
+            chunk_emails, chunk_uids = emails[start:start + 1000], uids[start:start + 1000]
+            users = User.objects.filter(email_normalized__in=chunk_emails) | User.objects.filter(firebase_uid__in=chunk_uids)
+            for uid in users.exclude(firebase_uid__isnull=True).values_list('firebase_uid', flat=True):
+                revocation_cache.mark_revoked(uid, ALWAYS_REVOKED)
+            marked += users.update(pending_deletion=True, is_active=False, deletion_requested_at=timezone.now())
+        self.stdout.write(f"Marked {marked} users as pending deletion")
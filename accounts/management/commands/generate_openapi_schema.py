@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from drf_with_firebase_auth.schema import get_schema_dir, write_schema
+
+
+class Command(BaseCommand):
+    help = "Render the OpenAPI schema (json and yaml, plain and gzip) at build time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', default=None,
+                            help='Directory to write the schema to (defaults to OPENAPI_SCHEMA_DIR).')
+
+    def handle(self, *args, **options):
+        for path in write_schema(options['output_dir'] or get_schema_dir()):
+            self.stdout.write(f"Wrote {path} ({path.stat().st_size} bytes)")
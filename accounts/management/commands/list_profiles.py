@@ -0,0 +1,50 @@
+import io
+import pstats
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.middleware import get_request_profiling_config, list_profiles
+
+
+class Command(BaseCommand):
+    help = "List request profiles captured by RequestProfilingMiddleware, or summarize one of them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?', help='Profile to summarize; lists every profile when omitted.')
+        parser.add_argument('--sort', default='cumulative', help='pstats sort key (cumulative, tottime, calls, ...).')
+        parser.add_argument('--limit', type=int, default=25, help='Functions or allocation sites to show.')
+
+    def handle(self, *args, **options):
+        directory = Path(get_request_profiling_config()['DIRECTORY'])
+        if not options['profile_id']:
+            profiles = list_profiles(directory)
+            if not profiles:
+                self.stdout.write(f"No profiles in {directory}")
+            for profile in profiles:
+                started_at = datetime.fromtimestamp(profile['started_at'], tz=timezone.utc)
+                memory = ''
+                if profile.get('tracemalloc_peak_bytes') is not None:
+                    memory = f", peak {profile['tracemalloc_peak_bytes'] / 1024:.1f} KiB"
+                self.stdout.write(
+                    f"{profile['id']}  {started_at:%Y-%m-%d %H:%M:%S}  {profile['method']} {profile['path']} "
+                    f"-> {profile['status_code']} in {profile['duration_ms']:.1f} ms ({profile['trigger']}{memory})"
+                )
+            return
+
+        base = directory / options['profile_id']
+        if not base.with_suffix('.prof').exists():
+            raise CommandError(f"No profile {options['profile_id']} in {directory}")
+
+        stream = io.StringIO()
+        pstats.Stats(str(base.with_suffix('.prof')), stream=stream).strip_dirs() \
+            .sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(stream.getvalue())
+
+        if base.with_suffix('.tracemalloc').exists():
+            snapshot = tracemalloc.Snapshot.load(str(base.with_suffix('.tracemalloc')))
+            self.stdout.write("Top allocation sites:")
+            for stat in snapshot.statistics('lineno')[:options['limit']]:
+                self.stdout.write(f"  {stat}")
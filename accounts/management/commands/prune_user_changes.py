@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.change_feed import prune_changes
+
+
+class Command(BaseCommand):
+    help = "Delete user change feed entries older than the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Retention in days (default: USER_CHANGE_FEED RETENTION_DAYS).')
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} user changes"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from accounts.firebase_auth.custom_claims import custom_claims_sync
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = "Write is_staff, is_superuser and group roles of every user into Firebase custom claims."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--staff-only', action='store_true',
+                            help='Only sync users with staff, superuser or group roles.')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(firebase_uid__isnull=False)
+        if options['staff_only']:
+            users = users.filter(is_staff=True) | users.filter(is_superuser=True) | users.filter(groups__isnull=False)
+        pks = list(users.distinct().values_list('pk', flat=True))
+        batch_size = custom_claims_sync.config['BATCH_SIZE']
+        for start in range(0, len(pks), batch_size):
+            for pk in pks[start:start + batch_size]:
+                custom_claims_sync.enqueue(pk)
+            custom_claims_sync.flush()
+            self.stdout.write(f"Synced {min(start + batch_size, len(pks))}/{len(pks)} users")
+        self.stdout.write(f"Done: {custom_claims_sync.stats()}")
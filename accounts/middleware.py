@@ -0,0 +1,154 @@
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    # fraction of requests profiled without being asked to
+    'SAMPLE_RATE': 0.0,
+    # requests carrying this header and a token with the is_staff claim are profiled; "memory" also traces allocations
+    'HEADER': 'X-Profile-Request',
+    'TRACEMALLOC': False,
+    'TRACEMALLOC_FRAMES': 10,
+    'DIRECTORY': 'profiles',
+    # oldest captures are removed beyond this many
+    'MAX_PROFILES': 50,
+}
+
+
+def get_request_profiling_config():
+    return dict(DEFAULTS, **getattr(settings, 'REQUEST_PROFILING', {}))
+
+
+def list_profiles(directory=None):
+    """
+    Return the metadata of every captured profile, newest first.
+    """
+    directory = Path(directory or get_request_profiling_config()['DIRECTORY'])
+    profiles = []
+    for path in directory.glob('*.json'):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda profile: profile['started_at'], reverse=True)
+
+
+class RequestProfilingMiddleware:
+    """
+    Profile single requests with cProfile, and optionally tracemalloc, on demand.
+
+    A request is profiled when it carries the `HEADER` header with a Firebase token holding
+    the `is_staff` claim, or when it is picked by `SAMPLE_RATE`. Only one request per process
+    is profiled at a time; others run untouched. Each capture writes `<id>.prof` (pstats),
+    `<id>.json` (metadata) and, with allocation tracing, `<id>.tracemalloc` to `DIRECTORY`,
+    keeping the newest `MAX_PROFILES`. The profile id is returned in `X-Profile-Id`.
+
+    When `ENABLED` is off the middleware removes itself from the chain at startup, so it
+    costs nothing per request.
+
+    """
+
+    def __init__(self, get_response):
+        config = get_request_profiling_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.config = config
+        self.directory = Path(config['DIRECTORY'])
+        self.meta_header = 'HTTP_' + config['HEADER'].upper().replace('-', '_')
+        self._active = threading.Lock()
+
+    def __call__(self, request):
+        trigger = self.get_trigger(request)
+        if trigger is None or not self._active.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request, trigger)
+        finally:
+            self._active.release()
+
+    def get_trigger(self, request):
+        requested = request.META.get(self.meta_header)
+        if requested:
+            return requested.lower() if self.is_staff_request(request) else None
+        if self.config['SAMPLE_RATE'] and random.random() < self.config['SAMPLE_RATE']:
+            return 'sample'
+        return None
+
+    def is_staff_request(self, request):
+        from .firebase_auth.firebase_authentication import FirebaseClaimsAuthentication
+        try:
+            decoded_token = FirebaseClaimsAuthentication().get_decoded_token(request)
+        except Exception:
+            return False
+        return bool(decoded_token and decoded_token.get('is_staff'))
+
+    def profile(self, request, trigger):
+        trace_memory = (self.config['TRACEMALLOC'] or trigger == 'memory') and not tracemalloc.is_tracing()
+        profiler = cProfile.Profile()
+        started_at = time.time()
+        if trace_memory:
+            tracemalloc.start(self.config['TRACEMALLOC_FRAMES'])
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot() if trace_memory else None
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+
+        profile_id = '{}{:03d}-{}-{}'.format(
+            time.strftime('%Y%m%dT%H%M%S', time.gmtime(started_at)),
+            int(started_at * 1000) % 1000,
+            request.method.lower(),
+            re.sub(r'[^a-zA-Z0-9]+', '_', request.path).strip('_')[:60] or 'root',
+        )
+        try:
+            self.write(profile_id, profiler, snapshot, {
+                'id': profile_id,
+                'method': request.method,
+                'path': request.path,
+                'status_code': response.status_code,
+                'trigger': 'sample' if trigger == 'sample' else 'header',
+                'started_at': started_at,
+                'duration_ms': round(elapsed * 1000, 3),
+                'tracemalloc_peak_bytes': peak,
+            })
+            response['X-Profile-Id'] = profile_id
+        except OSError:
+            logger.warning("Could not write request profile %s.", profile_id, exc_info=True)
+        return response
+
+    def write(self, profile_id, profiler, snapshot, metadata):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        base = self.directory / profile_id
+        profiler.dump_stats(f'{base}.prof')
+        if snapshot is not None:
+            snapshot.dump(f'{base}.tracemalloc')
+        # metadata last, so that listed profiles always have their stats on disk
+        Path(f'{base}.json').write_text(json.dumps(metadata))
+        self.prune()
+
+    def prune(self):
+        captures = sorted(self.directory.glob('*.json'), key=os.path.getmtime, reverse=True)
+        for stale in captures[self.config['MAX_PROFILES']:]:
+            for suffix in ('.json', '.prof', '.tracemalloc'):
+                stale.with_suffix(suffix).unlink(missing_ok=True)
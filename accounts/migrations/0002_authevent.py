@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(choices=[('sign_up', 'sign up'), ('sign_in', 'sign in'), ('sign_in_failed', 'failed sign in'), ('password_reset', 'password reset'), ('email_change', 'email change')], max_length=32)),
+                ('success', models.BooleanField(default=True)),
+                ('email', models.CharField(blank=True, max_length=254)),
+                ('firebase_uid', models.CharField(blank=True, max_length=255, null=True)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.CharField(blank=True, max_length=255)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'auth event',
+                'verbose_name_plural': 'auth events',
+                'db_table': 'auth_event',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_pending_deletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('user_id', models.UUIDField(db_index=True)),
+                ('firebase_uid', models.CharField(blank=True, max_length=255, null=True)),
+                ('operation', models.CharField(choices=[('create', 'create'), ('update', 'update'), ('delete', 'delete')], max_length=16)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'user change',
+                'verbose_name_plural': 'user changes',
+                'db_table': 'user_change',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, transaction
+from django.db.models.functions import Lower, Trim
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_email_normalized(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    pending = User.objects.using(schema_editor.connection.alias).filter(email_normalized__isnull=True).order_by('pk')
+    last_pk = None
+    while True:
+        # keyset pagination; each batch is one UPDATE committed on its own, so locks stay short on large tables
+        page = pending if last_pk is None else pending.filter(pk__gt=last_pk)
+        pks = list(page.values_list('pk', flat=True)[:BATCH_SIZE])
+        if not pks:
+            break
+        with transaction.atomic(using=schema_editor.connection.alias):
+            User.objects.using(schema_editor.connection.alias).filter(pk__in=pks).update(
+                email_normalized=Lower(Trim('email'))
+            )
+        last_pk = pks[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0005_user_email_normalized'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_email_normalized, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:07
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_existing_changes(apps, schema_editor):
+    # existing cursors were ids; numbering the changes already logged by their id keeps them valid
+    UserChange = apps.get_model('accounts', 'UserChange')
+    UserChange.objects.using(schema_editor.connection.alias).filter(sequence__isnull=True).update(sequence=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_backfill_user_email_normalized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userchange',
+            name='sequence',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_userchange_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SharedClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'shared claim',
+                'verbose_name_plural': 'shared claims',
+                'db_table': 'shared_claim',
+            },
+        ),
+    ]
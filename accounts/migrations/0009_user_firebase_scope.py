@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_sharedclaim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='firebase_project_id',
+            field=models.CharField(blank=True, max_length=128, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='firebase_tenant_id',
+            field=models.CharField(blank=True, max_length=128, null=True),
+        ),
+    ]
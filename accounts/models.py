@@ -1,11 +1,27 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.base_user import BaseUserManager
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from .hashers import set_mirror_password
+from .utils.emails import normalize_lookup_email
 import uuid
 
 
 class CustomUserManager(BaseUserManager):
+    def get_by_email(self, email):
+        # case-insensitive, served by the email_normalized index
+        if not isinstance(email, str) or not email.strip():
+            raise self.model.DoesNotExist(_('No email was given.'))
+        # legacy rows whose emails differ only by case share a normalized email; the newest one wins
+        user = self.filter(email_normalized=normalize_lookup_email(email)).order_by('-date_joined', '-pk').first()
+        if user is None:
+            raise self.model.DoesNotExist(_('No user has this email.'))
+        return user
+
+    def get_by_natural_key(self, username):
+        return self.get_by_email(username)
+
     def create_user(self, email, password, **extra_fields):
         if not email:
             raise ValueError(_('The Email must be set'))
@@ -14,7 +30,7 @@ class CustomUserManager(BaseUserManager):
             email=email, 
             **extra_fields
         )
-        user.set_password(password)
+        set_mirror_password(user, password)
         user.save()
         return user
     
@@ -33,8 +49,17 @@ class CustomUserManager(BaseUserManager):
 class User(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     email = models.EmailField(_('email address'), unique=True)
+    # lowercased email kept in sync on save; every email lookup goes through it (see CustomUserManager.get_by_email)
+    email_normalized = models.CharField(max_length=254, blank=True, null=True, editable=False, db_index=True)
     username = None
     firebase_uid = models.CharField(max_length=255, blank=True, null=True)
+    # where the uid lives when it is not the default firebase project (see FIREBASE_TENANTS); uids are only unique within one
+    firebase_project_id = models.CharField(max_length=128, blank=True, null=True)
+    firebase_tenant_id = models.CharField(max_length=128, blank=True, null=True)
+    # set when deletion is requested; the account is removed from firebase and the database in batches
+    pending_deletion = models.BooleanField(default=False, db_index=True)
+    deletion_requested_at = models.DateTimeField(blank=True, null=True)
+    deletion_attempts = models.PositiveSmallIntegerField(default=0)
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
@@ -42,9 +67,110 @@ class User(AbstractUser):
     
     def __str__(self):
         return self.email
+
+    def save(self, *args, **kwargs):
+        self.email_normalized = normalize_lookup_email(self.email) if self.email else None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'email_normalized'}
+        super().save(*args, **kwargs)
     
     class Meta:
         db_table = 'user'
         verbose_name = _('user')
         verbose_name_plural = _('users')
         ordering = ['-date_joined']
+
+
+class AuthEvent(models.Model):
+    """
+    Append-only record of an authentication event, written in batches by the auth event log.
+    """
+    SIGN_UP = 'sign_up'
+    SIGN_IN = 'sign_in'
+    SIGN_IN_FAILED = 'sign_in_failed'
+    PASSWORD_RESET = 'password_reset'
+    EMAIL_CHANGE = 'email_change'
+    EVENT_TYPES = [
+        (SIGN_UP, _('sign up')),
+        (SIGN_IN, _('sign in')),
+        (SIGN_IN_FAILED, _('failed sign in')),
+        (PASSWORD_RESET, _('password reset')),
+        (EMAIL_CHANGE, _('email change')),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    event_type = models.CharField(max_length=32, choices=EVENT_TYPES)
+    success = models.BooleanField(default=True)
+    email = models.CharField(max_length=254, blank=True)
+    firebase_uid = models.CharField(max_length=255, blank=True, null=True)
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError(_('Auth events are append-only and cannot be updated.'))
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError(_('Auth events are append-only and cannot be deleted.'))
+
+    def __str__(self):
+        return f'{self.event_type} {self.email}'
+
+    class Meta:
+        db_table = 'auth_event'
+        verbose_name = _('auth event')
+        verbose_name_plural = _('auth events')
+        ordering = ['-created_at']
+
+
+class UserChange(models.Model):
+    """
+    Append-only log of `User` saves and deletes, read by downstream services through a monotonic cursor.
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    OPERATIONS = [
+        (CREATE, _('create')),
+        (UPDATE, _('update')),
+        (DELETE, _('delete')),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # the cursor: numbered in commit order once the row is visible (see accounts.change_feed.sequence_changes),
+    # so a consumer resuming after the last sequence it has seen never skips a change that committed late
+    sequence = models.BigIntegerField(blank=True, null=True, unique=True)
+    user_id = models.UUIDField(db_index=True)
+    firebase_uid = models.CharField(max_length=255, blank=True, null=True)
+    operation = models.CharField(max_length=16, choices=OPERATIONS)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.operation} {self.user_id}'
+
+    class Meta:
+        db_table = 'user_change'
+        verbose_name = _('user change')
+        verbose_name_plural = _('user changes')
+        ordering = ['id']
+
+
+class SharedClaim(models.Model):
+    """
+    A key held by one process until `expires_at`; the unique key makes claiming it atomic across processes.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
+
+    class Meta:
+        db_table = 'shared_claim'
+        verbose_name = _('shared claim')
+        verbose_name_plural = _('shared claims')
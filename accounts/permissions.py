@@ -0,0 +1,36 @@
+from rest_framework.permissions import BasePermission
+
+
+class HasStaffClaim(BasePermission):
+    """
+    Allows access only to users whose Firebase token carries the `is_staff` custom claim.
+    """
+
+    def has_permission(self, request, view):
+        return bool(isinstance(request.auth, dict) and request.auth.get('is_staff'))
+
+
+class HasSuperuserClaim(BasePermission):
+    """
+    Allows access only to users whose Firebase token carries the `is_superuser` custom claim.
+    """
+
+    def has_permission(self, request, view):
+        return bool(isinstance(request.auth, dict) and request.auth.get('is_superuser'))
+
+
+class HasRoleClaim(BasePermission):
+    """
+    Allows access only to users whose Firebase token lists one of `required_roles` in its `roles` claim.
+
+    Subclass it and set `required_roles`, or let the view declare `required_roles`.
+    """
+    required_roles = ()
+
+    def has_permission(self, request, view):
+        if not isinstance(request.auth, dict):
+            return False
+        required_roles = getattr(view, 'required_roles', None) or self.required_roles
+        if request.auth.get('is_superuser'):
+            return True
+        return bool(set(required_roles) & set(request.auth.get('roles', ())))
@@ -1,5 +1,9 @@
+from operator import attrgetter, itemgetter
+
+from django.db.models import QuerySet
 from rest_framework import serializers
 from .models import User
+from .hashers import set_mirror_password
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -13,7 +17,7 @@ class UserSerializer(serializers.ModelSerializer):
         password = validated_data.pop('password', None)
         instance = self.Meta.model(**validated_data)
         if password is not None:
-            instance.set_password(password)
+            set_mirror_password(instance, password)
         instance.save()
         return instance
     
@@ -22,11 +26,48 @@ class UserSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         if password is not None:
-            instance.set_password(password)
+            set_mirror_password(instance, password)
         instance.save()
         return instance
 
 
+class UserReadSerializer:
+    """
+    Read-only serializer producing the same output as `UserSerializer`, without DRF field introspection.
+
+    The read paths only emit flat columns, so each object is turned into a dict by one
+    getter and a uuid conversion. Accepts model instances, `.values()` rows, or (with
+    `many=True`) a queryset, which is then fetched with `.values()` and never builds models.
+
+    Attributes:
+    - `data` (dict | list): The serialized object(s).
+
+    """
+    fields = ('id', 'firebase_uid', 'email', 'first_name', 'last_name')
+
+    _get_attrs = attrgetter(*fields)
+    _get_items = itemgetter(*fields)
+
+    def __init__(self, instance=None, many=False):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def to_representation(cls, obj):
+        values = cls._get_items(obj) if isinstance(obj, dict) else cls._get_attrs(obj)
+        row = dict(zip(cls.fields, values))
+        if row['id'] is not None:
+            row['id'] = str(row['id'])
+        return row
+
+    @property
+    def data(self):
+        if not self.many:
+            return self.to_representation(self.instance)
+        rows = self.instance.values(*self.fields) if isinstance(self.instance, QuerySet) else self.instance
+        return [self.to_representation(row) for row in rows]
+
+
 class UserUpdateSerializer(serializers.ModelSerializer):
     
     class Meta:
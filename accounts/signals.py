@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .change_feed import record_user_change
+from .firebase_auth.custom_claims import custom_claims_sync
+from .firebase_auth.principal import active_user_cache
+from .models import User, UserChange
+from .utils.email_lookup_filter import email_lookup_filter
+
+
+def _role_flags(user):
+    # read from __dict__ so that deferred fields are never loaded just to take the snapshot
+    return (user.__dict__.get('is_staff'), user.__dict__.get('is_superuser'))
+
+
+def _enqueue_claims_sync(user_pk, demoted=False):
+    transaction.on_commit(lambda: custom_claims_sync.enqueue(user_pk, demoted))
+
+
+@receiver(post_save, sender=User)
+def add_email_to_lookup_filter(sender, instance, **kwargs):
+    # keep the negative-lookup filter current for users saved by this process
+    email_lookup_filter.add(instance.email)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_active_user(sender, instance, **kwargs):
+    # a user deleted or marked pending deletion here stops authenticating in this process right away
+    if instance.firebase_uid:
+        active_user_cache.invalidate(instance.firebase_uid, instance.firebase_project_id, instance.firebase_tenant_id)
+
+
+@receiver(post_save, sender=User)
+def log_user_save(sender, instance, created, update_fields=None, **kwargs):
+    record_user_change(instance, UserChange.CREATE if created else UserChange.UPDATE, update_fields)
+
+
+@receiver(post_delete, sender=User)
+def log_user_delete(sender, instance, **kwargs):
+    record_user_change(instance, UserChange.DELETE)
+
+
+@receiver(post_init, sender=User)
+def remember_role_flags(sender, instance, **kwargs):
+    instance._role_flags = _role_flags(instance)
+
+
+@receiver(post_save, sender=User)
+def sync_role_flags_to_custom_claims(sender, instance, created, **kwargs):
+    previous, current = instance._role_flags, _role_flags(instance)
+    instance._role_flags = current
+    if created:
+        if any(current):
+            _enqueue_claims_sync(instance.pk)
+    elif previous != current:
+        demoted = any(before and not after for before, after in zip(previous, current))
+        _enqueue_claims_sync(instance.pk, demoted)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def sync_groups_to_custom_claims(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    demoted = action != 'post_add'
+    if not reverse:
+        if action != 'pre_clear':
+            _enqueue_claims_sync(instance.pk, demoted)
+    elif action == 'pre_clear':
+        # the members of a cleared group are only known before the clear
+        for user_pk in instance.user_set.values_list('pk', flat=True):
+            _enqueue_claims_sync(user_pk, demoted)
+    elif action != 'post_clear':
+        for user_pk in pk_set:
+            _enqueue_claims_sync(user_pk, demoted)
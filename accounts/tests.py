@@ -1,3 +1,617 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
 
-# Create your tests here.
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qsl
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .change_feed import fetch_changes, sequence_changes, _authenticate_stream
+from .firebase_auth.firebase_exceptions import InvalidAuthToken, ExpiredAuthToken, RevocationCheckFailed
+from .firebase_auth.revocation import RevocationCache
+from .firebase_auth.securetoken import SecureTokenClient, SecureTokenError
+from .firebase_auth.internal_tokens import mint_internal_token, verify_internal_token, _b64decode, _b64encode
+from .firebase_auth import firebase_authentication
+from .hashers import sync_mirror_password
+from .models import User, UserChange
+from .utils.bulk_lookup import lookup_users
+from .utils.single_flight import SingleFlight, AsyncSingleFlight
+from .validators import BreachedPasswordIndex, BreachedPasswordValidator
+
+
+INTERNAL_TOKENS = {'KEYS': {'k1': 'secret-one'}, 'ACTIVE_KEY': 'k1'}
+
+
+def firebase_claims(**extra):
+    now = int(time.time())
+    return dict({
+        'uid': 'uid-1', 'email': 'user@example.com', 'email_verified': True,
+        'iat': now, 'exp': now + 3600, 'roles': ['support'],
+    }, **extra)
+
+
+@override_settings(INTERNAL_TOKENS=INTERNAL_TOKENS)
+class InternalTokenTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        token, lifetime = mint_internal_token(firebase_claims(), user_id='user-1')
+        claims = verify_internal_token(token)
+        self.assertEqual(claims['uid'], 'uid-1')
+        self.assertEqual(claims['user_id'], 'user-1')
+        self.assertEqual(claims['roles'], ['support'])
+        self.assertLessEqual(lifetime, 300)
+
+    def test_tampered_signature(self):
+        token, _ = mint_internal_token(firebase_claims())
+        signing_input, signature = token.rsplit('.', 1)
+        forged = bytearray(_b64decode(signature))
+        forged[0] ^= 1
+        with self.assertRaises(InvalidAuthToken):
+            verify_internal_token(f'{signing_input}.{_b64encode(bytes(forged))}')
+
+    def test_tampered_payload(self):
+        token, _ = mint_internal_token(firebase_claims())
+        prefix, key_id, payload, signature = token.split('.')
+        claims = _b64decode(payload).replace(b'"support"', b'"admin"')
+        with self.assertRaises(InvalidAuthToken):
+            verify_internal_token(f'{prefix}.{key_id}.{_b64encode(claims)}.{signature}')
+
+    def test_expired(self):
+        # the internal token never outlives the firebase token it was exchanged for
+        token, _ = mint_internal_token(firebase_claims(exp=int(time.time()) - 1))
+        with self.assertRaises(ExpiredAuthToken):
+            verify_internal_token(token)
+
+    def test_unknown_key(self):
+        with override_settings(INTERNAL_TOKENS={'KEYS': {'k9': 'secret-nine'}, 'ACTIVE_KEY': 'k9'}):
+            token, _ = mint_internal_token(firebase_claims())
+        with self.assertRaises(InvalidAuthToken):
+            verify_internal_token(token)
+
+    def test_rotation(self):
+        old_token, _ = mint_internal_token(firebase_claims())
+        rotated = {'KEYS': {'k1': 'secret-one', 'k2': 'secret-two'}, 'ACTIVE_KEY': 'k2'}
+        with override_settings(INTERNAL_TOKENS=rotated):
+            new_token, _ = mint_internal_token(firebase_claims())
+            self.assertEqual(new_token.split('.')[1], 'k2')
+            # tokens signed with the previous key are accepted while it is still listed
+            self.assertEqual(verify_internal_token(old_token)['uid'], 'uid-1')
+            self.assertEqual(verify_internal_token(new_token)['uid'], 'uid-1')
+        with override_settings(INTERNAL_TOKENS={'KEYS': {'k2': 'secret-two'}, 'ACTIVE_KEY': 'k2'}):
+            with self.assertRaises(InvalidAuthToken):
+                verify_internal_token(old_token)
+            self.assertEqual(verify_internal_token(new_token)['uid'], 'uid-1')
+
+    def test_disabled(self):
+        token, _ = mint_internal_token(firebase_claims())
+        with override_settings(INTERNAL_TOKENS=dict(INTERNAL_TOKENS, ENABLED=False)):
+            with self.assertRaises(InvalidAuthToken):
+                verify_internal_token(token)
+            with self.assertRaises(ValueError):
+                mint_internal_token(firebase_claims())
+
+    def test_malformed(self):
+        for token in ('it1', 'it1.k1.payload', 'it1.k1.!!.!!', 'other.k1.payload.signature'):
+            with self.assertRaises(InvalidAuthToken):
+                verify_internal_token(token)
+
+
+class MirrorPasswordTests(TestCase):
+    password = 'Correct-horse-1'
+
+    def create_user(self, **fields):
+        return User.objects.create_user('mirror@example.com', self.password, **fields)
+
+    def test_hash_is_upgraded_to_the_current_profile(self):
+        user = self.create_user()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        with override_settings(MIRROR_PASSWORD={'PROFILE': 'pbkdf2', 'PBKDF2_ITERATIONS': 1000}):
+            self.assertTrue(sync_mirror_password(user, self.password))
+            self.assertTrue(user.password.startswith('pbkdf2_sha256_mirror$1000$'))
+            # nothing to do once the hash matches the profile
+            self.assertFalse(sync_mirror_password(user, self.password))
+        with override_settings(MIRROR_PASSWORD={'PROFILE': 'pbkdf2', 'PBKDF2_ITERATIONS': 2000}):
+            self.assertTrue(sync_mirror_password(user, self.password))
+            self.assertTrue(user.password.startswith('pbkdf2_sha256_mirror$2000$'))
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256_mirror$2000$'))
+
+    @override_settings(MIRROR_PASSWORD={'PROFILE': 'pbkdf2', 'PBKDF2_ITERATIONS': 1000})
+    def test_password_changed_on_firebase_replaces_the_hash(self):
+        user = self.create_user()
+        self.assertTrue(sync_mirror_password(user, 'Changed-elsewhere-2'))
+        self.assertTrue(user.check_password('Changed-elsewhere-2'))
+        self.assertFalse(user.check_password(self.password))
+
+    @override_settings(MIRROR_PASSWORD={'PROFILE': 'pbkdf2', 'PBKDF2_ITERATIONS': 1000})
+    def test_staff_keep_the_full_strength_hash(self):
+        user = self.create_user(is_staff=True)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        self.assertFalse(sync_mirror_password(user, self.password))
+
+    def test_unusable_profile_drops_the_hash(self):
+        user = self.create_user()
+        with override_settings(MIRROR_PASSWORD={'PROFILE': 'unusable'}):
+            self.assertTrue(sync_mirror_password(user, self.password))
+            self.assertFalse(user.has_usable_password())
+            self.assertFalse(sync_mirror_password(user, self.password))
+
+
+class RevocationCacheTests(SimpleTestCase):
+
+    def make_cache(self, get_user):
+        cache = RevocationCache(auth_client=mock.Mock(get_user=get_user))
+        self.addCleanup(cache.close)
+        return cache
+
+    @staticmethod
+    def firebase_user(valid_after, disabled=False):
+        return mock.Mock(tokens_valid_after_timestamp=valid_after * 1000, disabled=disabled)
+
+    @override_settings(FIREBASE_REVOCATION_CHECK={'COLD_MISS': 'sync', 'TTL': 300})
+    def test_cached_state_is_served_until_the_ttl(self):
+        get_user = mock.Mock(return_value=self.firebase_user(1000))
+        cache = self.make_cache(get_user)
+        self.assertTrue(cache.is_revoked({'uid': 'uid-1', 'iat': 999}))
+        self.assertFalse(cache.is_revoked({'uid': 'uid-1', 'iat': 1000}))
+        self.assertEqual(get_user.call_count, 1)
+
+        with mock.patch.object(cache, '_schedule_refresh') as schedule_refresh:
+            cache.is_revoked({'uid': 'uid-1', 'iat': 1000})
+            schedule_refresh.assert_not_called()
+            # past the TTL the cached state is still used while a refresh runs in the background
+            valid_after, fetched_at = cache._entries['uid-1']
+            cache._entries['uid-1'] = (valid_after, fetched_at - 301)
+            self.assertFalse(cache.is_revoked({'uid': 'uid-1', 'iat': 1000}))
+            schedule_refresh.assert_called_once_with('uid-1')
+
+    @override_settings(FIREBASE_REVOCATION_CHECK={'COLD_MISS': 'sync'})
+    def test_disabled_users_and_local_revocations(self):
+        cache = self.make_cache(mock.Mock(return_value=self.firebase_user(0, disabled=True)))
+        self.assertTrue(cache.is_revoked({'uid': 'disabled', 'iat': int(time.time())}))
+        cache.mark_revoked('uid-2', valid_after=500)
+        self.assertTrue(cache.is_revoked({'uid': 'uid-2', 'iat': 499}))
+        self.assertFalse(cache.is_revoked({'uid': 'uid-2', 'iat': 500}))
+
+    @override_settings(FIREBASE_REVOCATION_CHECK={'COLD_MISS': 'async'})
+    def test_async_cold_miss_accepts_and_refreshes_in_the_background(self):
+        cache = self.make_cache(mock.Mock(return_value=self.firebase_user(1000)))
+        with mock.patch.object(cache, '_schedule_refresh') as schedule_refresh:
+            self.assertFalse(cache.is_revoked({'uid': 'uid-3', 'iat': 1}))
+            schedule_refresh.assert_called_once_with('uid-3')
+
+    def test_failed_sync_fetch(self):
+        cache = self.make_cache(mock.Mock(side_effect=RuntimeError('firebase unavailable')))
+        with self.assertLogs('accounts.firebase_auth.revocation', 'WARNING'):
+            with override_settings(FIREBASE_REVOCATION_CHECK={'COLD_MISS': 'sync'}):
+                with self.assertRaises(RevocationCheckFailed):
+                    cache.is_revoked({'uid': 'uid-4', 'iat': 1})
+            with override_settings(FIREBASE_REVOCATION_CHECK={'COLD_MISS': 'sync', 'ON_ERROR': 'allow'}):
+                self.assertFalse(cache.is_revoked({'uid': 'uid-4', 'iat': 1}))
+        self.assertEqual(cache.stats()['refresh_errors'], 2)
+
+    @override_settings(FIREBASE_REVOCATION_CHECK={'COLD_MISS': 'sync'})
+    def test_failed_sync_fetch_is_a_401(self):
+        cache = self.make_cache(mock.Mock(side_effect=RuntimeError('firebase unavailable')))
+        claims = {'uid': 'uid-5', 'email_verified': True, 'iat': 1}
+        with mock.patch.object(firebase_authentication, 'verify_id_token', return_value=claims), \
+                mock.patch.object(firebase_authentication.firebase_tenants, 'revocation_cache_for', return_value=cache), \
+                self.assertLogs('accounts.firebase_auth.revocation', 'WARNING'):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Bearer token')
+            response = client.get(f'/api/v1/users/{uuid.uuid4()}/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], RevocationCheckFailed.default_detail)
+
+
+class SingleFlightTests(SimpleTestCase):
+    callers = 8
+
+    def run_concurrently(self, flight, fn):
+        results, errors = [], []
+
+        def call():
+            try:
+                results.append(flight.do('key', fn))
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=call) for _ in range(self.callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return results, errors
+
+    def wait_for_callers(self, flight):
+        # the leader holds the call open until every other caller has joined it
+        deadline = time.monotonic() + 5
+        while flight.stats()['calls'] < self.callers and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight()
+        executions = []
+
+        def fn():
+            executions.append(1)
+            self.wait_for_callers(flight)
+            return 'value'
+
+        results, errors = self.run_concurrently(flight, fn)
+        self.assertEqual(executions, [1])
+        self.assertEqual(results, ['value'] * self.callers)
+        self.assertEqual(errors, [])
+        self.assertEqual(flight.stats(), {'calls': 8, 'executions': 1, 'coalesced': 7, 'in_flight': 0})
+
+    def test_every_caller_receives_the_error(self):
+        flight = SingleFlight()
+
+        def fn():
+            self.wait_for_callers(flight)
+            raise KeyError('missing')
+
+        results, errors = self.run_concurrently(flight, fn)
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), self.callers)
+        self.assertTrue(all(isinstance(error, KeyError) for error in errors))
+        # waiters get their own exception object, chained to the leader's
+        self.assertEqual(len({id(error) for error in errors}), self.callers)
+
+    def test_key_is_released_after_the_call(self):
+        flight = SingleFlight()
+        calls = []
+        self.assertEqual(flight.do('key', lambda: calls.append(1) or len(calls)), 1)
+        self.assertEqual(flight.do('key', lambda: calls.append(1) or len(calls)), 2)
+        with self.assertRaises(ValueError):
+            flight.do('key', self.fail_with_value_error)
+        self.assertEqual(flight.do('key', lambda: 'again'), 'again')
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    @staticmethod
+    def fail_with_value_error():
+        raise ValueError('boom')
+
+
+class AsyncSingleFlightTests(SimpleTestCase):
+    callers = 8
+
+    def test_concurrent_awaits_share_one_execution(self):
+        flight = AsyncSingleFlight()
+        executions = []
+
+        async def fn():
+            executions.append(1)
+            await asyncio.sleep(0.01)
+            return 'value'
+
+        async def run():
+            return await asyncio.gather(*(flight.do('key', fn) for _ in range(self.callers)))
+
+        self.assertEqual(asyncio.run(run()), ['value'] * self.callers)
+        self.assertEqual(executions, [1])
+        self.assertEqual(flight.stats(), {'calls': 8, 'executions': 1, 'coalesced': 7, 'in_flight': 0})
+
+    def test_every_caller_receives_the_error(self):
+        flight = AsyncSingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise KeyError('missing')
+
+        async def run():
+            return await asyncio.gather(*(flight.do('key', fn) for _ in range(self.callers)),
+                                        return_exceptions=True)
+
+        errors = asyncio.run(run())
+        self.assertTrue(all(isinstance(error, KeyError) for error in errors))
+        self.assertEqual(len({id(error) for error in errors}), self.callers)
+
+    def test_key_is_released_after_the_call(self):
+        flight = AsyncSingleFlight()
+        executions = []
+
+        async def fn():
+            executions.append(1)
+            return len(executions)
+
+        async def fail():
+            raise ValueError('boom')
+
+        async def run():
+            first = await flight.do('key', fn)
+            second = await flight.do('key', fn)
+            with self.assertRaises(ValueError):
+                await flight.do('key', fail)
+            third = await flight.do('key', fn)
+            return first, second, third, flight.stats()['in_flight']
+
+        self.assertEqual(asyncio.run(run()), (1, 2, 3, 0))
+
+
+@override_settings(INTERNAL_TOKENS=INTERNAL_TOKENS, FIREBASE_REVOCATION_CHECK={'ENABLED': False})
+class ChangeFeedTests(TestCase):
+
+    def record(self, **fields):
+        return UserChange.objects.create(user_id=uuid.uuid4(), operation=UserChange.UPDATE, **fields)
+
+    def test_change_committed_out_of_order_is_not_skipped(self):
+        self.record(id=100)
+        first = fetch_changes(0)
+        self.assertEqual([change['cursor'] for change in first], [1])
+        # a lower id that only became visible after the consumer read past the higher one
+        late = self.record(id=50)
+        second = fetch_changes(first[-1]['cursor'])
+        self.assertEqual([change['user_id'] for change in second], [str(late.user_id)])
+        self.assertEqual(second[0]['cursor'], 2)
+
+    def test_concurrent_sequencing_gives_up_and_the_next_pass_numbers_the_rows(self):
+        self.record(sequence=1)
+        pending = self.record()
+        # another pass numbered a row between this pass reading the highest sequence and writing its own
+        with mock.patch.object(UserChange.objects, 'aggregate', return_value={'last': 0}):
+            self.assertEqual(sequence_changes(), 0)
+        pending.refresh_from_db()
+        self.assertIsNone(pending.sequence)
+        self.assertEqual(sequence_changes(), 1)
+        pending.refresh_from_db()
+        self.assertEqual(pending.sequence, 2)
+
+    def test_paging_resumes_from_next_cursor(self):
+        recorded = [self.record() for _ in range(5)]
+        token, _ = mint_internal_token(firebase_claims(is_staff=True))
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        seen, cursor = [], 0
+        for _ in range(4):
+            response = client.get('/api/v1/users/changes/', {'cursor': cursor, 'limit': 2})
+            self.assertEqual(response.status_code, 200)
+            data = response.json()['data']
+            seen += [change['user_id'] for change in data['changes']]
+            cursor = data['next_cursor']
+        self.assertEqual(seen, [str(change.user_id) for change in recorded])
+        self.assertEqual(cursor, 5)
+
+    def test_stream_accepts_internal_tokens(self):
+        staff_token, _ = mint_internal_token(firebase_claims(is_staff=True))
+        user_token, _ = mint_internal_token(firebase_claims())
+        factory = RequestFactory()
+        self.assertTrue(_authenticate_stream(factory.get('/', HTTP_AUTHORIZATION=f'Bearer {staff_token}')))
+        self.assertFalse(_authenticate_stream(factory.get('/', HTTP_AUTHORIZATION=f'Bearer {user_token}')))
+
+
+class BreachedPasswordIndexTests(SimpleTestCase):
+    first = '0000' + '11' * 18
+    last = 'ffff' + '22' * 18
+    breached = hashlib.sha1(b'Password1!').hexdigest()
+
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.workdir = workdir.name
+
+    def compile(self, lines, *args):
+        source = os.path.join(self.workdir, 'source.txt')
+        output = os.path.join(self.workdir, 'index.bin')
+        with open(source, 'w', encoding='utf-8', newline='') as f:
+            f.write(''.join(lines))
+        stderr = StringIO()
+        call_command('compile_breached_passwords', source, *args, output=output, stdout=StringIO(), stderr=stderr)
+        return output, stderr.getvalue()
+
+    def test_compiled_index_round_trip(self):
+        lines = [f'{self.last.upper()}:3\n', f'{self.breached}:120\n', f'{self.first}:1\r\n', f'{self.breached}:2\n']
+        output, _ = self.compile(lines)
+        index = BreachedPasswordIndex(output)
+        self.addCleanup(index.close)
+        self.assertEqual(index.count, 3)
+        for digest in (self.first, self.breached, self.last):
+            self.assertTrue(index.contains_sha1(bytes.fromhex(digest)), digest)
+        self.assertTrue(index.contains_password('Password1!'))
+        self.assertFalse(index.contains_password('a clean passphrase that nobody leaked'))
+        self.assertFalse(index.contains_sha1(bytes.fromhex('0000' + '10' * 18)))
+        self.assertFalse(index.contains_sha1(bytes.fromhex('ffff' + '23' * 18)))
+
+    def test_malformed_lines_are_skipped_and_reported(self):
+        lines = [f'{self.breached}:lots\n', 'not-a-digest:5\n', 'abcd\n', f'{self.first}:4\n']
+        output, stderr = self.compile(lines, '--min-count', '2')
+        index = BreachedPasswordIndex(output)
+        self.addCleanup(index.close)
+        self.assertEqual(index.count, 1)
+        self.assertTrue(index.contains_sha1(bytes.fromhex(self.first)))
+        self.assertIn('Skipped 3 malformed lines', stderr)
+
+    def test_plaintext_keeps_surrounding_whitespace(self):
+        output, _ = self.compile([' padded secret \r\n', 'tab\t\n'], '--plaintext')
+        index = BreachedPasswordIndex(output)
+        self.addCleanup(index.close)
+        self.assertTrue(index.contains_password(' padded secret '))
+        self.assertTrue(index.contains_password('tab\t'))
+        self.assertFalse(index.contains_password('padded secret'))
+
+    def test_validator_uses_the_compiled_index(self):
+        output, _ = self.compile([f'{self.breached}\n'])
+        with override_settings(BREACHED_PASSWORDS={'PATH': output}):
+            with self.assertRaises(ValidationError):
+                BreachedPasswordValidator().validate('Password1!')
+            BreachedPasswordValidator().validate('Another-Password2?')
+
+
+class _SecureTokenStub(BaseHTTPRequestHandler):
+    """
+    Answers like the securetoken service, picking the response by the refresh token sent.
+    """
+    requests = []
+
+    def do_POST(self):
+        form = dict(parse_qsl(self.rfile.read(int(self.headers['Content-Length'])).decode()))
+        self.requests.append((self.path, form))
+        refresh_token = form.get('refresh_token')
+        if refresh_token == 'valid':
+            self.reply(200, 'application/json', json.dumps({
+                'id_token': 'new-id-token', 'refresh_token': 'next-refresh-token', 'expires_in': '3600', 'user_id': 'uid-1',
+            }))
+        elif refresh_token == 'html':
+            self.reply(200, 'text/html', '<html>maintenance</html>')
+        else:
+            self.reply(400, 'application/json', json.dumps({'error': {'message': 'TOKEN_EXPIRED'}}))
+
+    def reply(self, status_code, content_type, body):
+        self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class SecureTokenClientTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _SecureTokenStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _SecureTokenStub.requests = []
+        self.client_under_test = SecureTokenClient(f'http://127.0.0.1:{self.server.server_port}', 'api-key', timeout=5)
+
+    def test_refresh(self):
+        tokens = self.client_under_test.refresh('valid')
+        self.assertEqual(tokens['id_token'], 'new-id-token')
+        self.assertEqual(_SecureTokenStub.requests, [
+            ('/v1/token?key=api-key', {'grant_type': 'refresh_token', 'refresh_token': 'valid'}),
+        ])
+
+    def test_upstream_rejection(self):
+        with self.assertRaises(SecureTokenError) as raised:
+            self.client_under_test.refresh('expired')
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual(str(raised.exception), 'TOKEN_EXPIRED')
+
+    def test_non_json_response(self):
+        with self.assertRaises(SecureTokenError) as raised:
+            self.client_under_test.refresh('html')
+        self.assertIsNone(raised.exception.status_code)
+
+    def test_refresh_view(self):
+        with mock.patch('accounts.views.get_securetoken_client', return_value=self.client_under_test), \
+                mock.patch('accounts.views.verify_id_token', side_effect=ValueError):
+            client = APIClient()
+            responses = {token: client.post('/api/v1/users/auth/refresh/', {'refresh_token': token}, format='json')
+                         for token in ('valid', 'expired', 'html')}
+        self.assertEqual(responses['valid'].status_code, 200)
+        self.assertEqual(responses['valid'].json()['data']['firebase_access_token'], 'new-id-token')
+        self.assertEqual(responses['expired'].status_code, 400)
+        self.assertEqual(responses['html'].status_code, 502)
+
+
+@override_settings(FIREBASE_AUTH_LAZY_USER=False, FIREBASE_TENANTS={'ENABLED': True, 'PROVISION_USERS': True})
+class TenantUserProvisioningTests(TestCase):
+
+    def authenticate(self, uid, email, tenant_id='tenant-a'):
+        claims = {'uid': uid, 'email': email, 'email_verified': True, 'iat': 0, 'aud': 'other-project',
+                  'firebase': {'tenant': tenant_id}}
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION='Bearer token')
+        with mock.patch.object(firebase_authentication, 'verify_id_token', return_value=claims), \
+                mock.patch.object(firebase_authentication.firebase_tenants, 'revocation_cache_for',
+                                  return_value=mock.Mock(is_revoked=mock.Mock(return_value=False))):
+            return firebase_authentication.FirebaseAuthentication().authenticate(request)[0]
+
+    def test_first_request_creates_the_scoped_user(self):
+        User.objects.create(email='default@example.com', firebase_uid='uid-1')
+        user = self.authenticate('uid-1', 'tenant@example.com')
+        self.assertEqual((user.firebase_project_id, user.firebase_tenant_id), ('other-project', 'tenant-a'))
+        self.assertFalse(user.has_usable_password())
+        self.assertEqual(self.authenticate('uid-1', 'tenant@example.com').pk, user.pk)
+
+    def test_email_of_another_user_is_rejected(self):
+        User.objects.create(email='taken@example.com', firebase_uid='uid-1')
+        with self.assertRaises(firebase_authentication.FirebaseError):
+            self.authenticate('uid-2', 'taken@example.com')
+
+    def test_nothing_is_created_when_provisioning_is_off(self):
+        with override_settings(FIREBASE_TENANTS={'ENABLED': True}):
+            with self.assertRaises(firebase_authentication.FirebaseError):
+                self.authenticate('uid-3', 'new@example.com')
+        self.assertFalse(User.objects.filter(firebase_uid='uid-3').exists())
+
+
+@override_settings(INTERNAL_TOKENS=INTERNAL_TOKENS, FIREBASE_REVOCATION_CHECK={'ENABLED': False},
+                   USER_BULK_LOOKUP={'CHUNK_SIZE': 2, 'STREAM_THRESHOLD': 3, 'MAX_IDS': 10})
+class BulkLookupTests(TestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create(email=f'bulk{i}@example.com', firebase_uid=f'uid-{i}') for i in range(5)]
+        User.objects.create(email='pending@example.com', firebase_uid='uid-pending', pending_deletion=True)
+        User.objects.create(email='tenant@example.com', firebase_uid='uid-0', firebase_tenant_id='tenant-a')
+
+    def test_lookup_by_id_in_one_query(self):
+        first = self.users[0]
+        keys = [str(user.id) for user in self.users] + [first.id.hex.upper(), 'not-a-uuid', str(uuid.uuid4())]
+        with self.assertNumQueries(1):
+            found = dict(lookup_users(keys))
+        self.assertEqual(len(found), len(keys))
+        for user in self.users:
+            self.assertEqual(found[str(user.id)]['email'], user.email)
+        # another spelling of an id gets the same user
+        self.assertEqual(found[first.id.hex.upper()], found[str(first.id)])
+        self.assertIsNone(found['not-a-uuid'])
+        self.assertIsNone(found[keys[-1]])
+
+    def test_lookup_by_firebase_uid_is_scoped(self):
+        found = dict(lookup_users(['uid-0', 'uid-1', 'uid-pending'], 'firebase_uid'))
+        self.assertEqual(found['uid-0']['email'], 'bulk0@example.com')
+        self.assertEqual(found['uid-1']['email'], 'bulk1@example.com')
+        self.assertIsNone(found['uid-pending'])
+        tenant_found = dict(lookup_users(['uid-0', 'uid-1'], 'firebase_uid', None, 'tenant-a'))
+        self.assertEqual(tenant_found['uid-0']['email'], 'tenant@example.com')
+        self.assertIsNone(tenant_found['uid-1'])
+
+    def post(self, data):
+        token, _ = mint_internal_token(firebase_claims(is_staff=True))
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client.post('/api/v1/users/bulk/', data, format='json')
+
+    def test_small_requests_are_answered_in_one_body(self):
+        response = self.post({'firebase_uids': ['uid-1', 'uid-2']})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertEqual(set(response.json()['data']['users']), {'uid-1', 'uid-2'})
+
+    def test_large_requests_are_streamed(self):
+        ids = [str(user.id) for user in self.users] + [str(uuid.uuid4())]
+        response = self.post({'ids': ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body['status'], 'success')
+        self.assertEqual(set(body['data']['users']), set(ids))
+        self.assertIsNone(body['data']['users'][ids[-1]])
+        self.assertEqual(body['data']['users'][ids[0]]['email'], 'bulk0@example.com')
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.post({'ids': 'not-a-list'}).status_code, 400)
+        self.assertEqual(self.post({'ids': [], 'firebase_uids': []}).status_code, 400)
+        self.assertEqual(self.post({'ids': [str(uuid.uuid4()) for _ in range(11)]}).status_code, 400)
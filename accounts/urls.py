@@ -2,14 +2,26 @@ from django.urls import path
 from .views import (
     AuthCreateNewUserView,
     AuthLoginExisitingUserView,
+    AuthRefreshTokenView,
+    AuthInternalTokenView,
     RetrieveUpdateDestroyExistingUser,
     UpdateUserEmailAddressView,
-    UserPasswordResetView
+    UserPasswordResetView,
+    UserChangeFeedView,
+    UserBulkLookupView,
+    MetricsView,
 )
+from .change_feed import user_change_stream
 
 urlpatterns = [
     path('auth/sign-up/', AuthCreateNewUserView.as_view(), name='auth-create-user'),
     path('auth/sign-in/', AuthLoginExisitingUserView.as_view(), name='auth-login-drive-user'),
+    path('auth/refresh/', AuthRefreshTokenView.as_view(), name='auth-refresh-token'),
+    path('auth/internal-token/', AuthInternalTokenView.as_view(), name='auth-internal-token'),
+    path('bulk/', UserBulkLookupView.as_view(), name='user-bulk-lookup'),
+    path('changes/', UserChangeFeedView.as_view(), name='user-change-feed'),
+    path('changes/stream/', user_change_stream, name='user-change-stream'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('<str:pk>/', RetrieveUpdateDestroyExistingUser.as_view(), name='retrieve-update-user'),
     path('auth/update-email-address/', UpdateUserEmailAddressView.as_view(), name='user-update-email-address'),
     path('auth/reset-password/', UserPasswordResetView.as_view(), name='user-reset-password'),
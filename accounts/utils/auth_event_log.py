@@ -0,0 +1,222 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SINK': 'database',
+    'PATH': None,
+    'MAX_BYTES': 50 * 1024 * 1024,
+    'BACKUP_COUNT': 10,
+    'QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+    'OVERFLOW_POLICY': DROP_NEWEST,
+    'BLOCK_TIMEOUT': 0.05,
+}
+
+
+class DatabaseSink:
+    """
+    Write events into the append-only `AuthEvent` table with one `bulk_create` per batch.
+    """
+
+    def write(self, events):
+        from accounts.models import AuthEvent
+        AuthEvent.objects.bulk_create([AuthEvent(**event) for event in events], batch_size=len(events))
+
+    def close(self):
+        pass
+
+
+class JsonlFileSink:
+    """
+    Append events as JSON lines to a size-rotated file.
+    """
+
+    def __init__(self, path, max_bytes, backup_count):
+        self.handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+        self.handler.setFormatter(logging.Formatter('%(message)s'))
+
+    def write(self, events):
+        for event in events:
+            line = json.dumps(event, default=str, separators=(',', ':'))
+            self.handler.emit(logging.makeLogRecord({'msg': line}))
+        self.handler.flush()
+
+    def close(self):
+        self.handler.close()
+
+
+class AuthEventLog:
+    """
+    Bounded in-process queue of auth events, drained in batches by a background thread.
+
+    Recording an event never touches the database or the disk; it only enqueues a dict.
+    When the queue is full the overflow policy decides what happens:
+    - `drop_newest`: discard the incoming event.
+    - `drop_oldest`: discard the oldest queued event to make room.
+    - `block`: wait up to `block_timeout` seconds for room, then discard the incoming event.
+
+    Methods:
+    - `record`: Enqueue an event.
+    - `flush`: Write everything currently queued (called by the flusher).
+    - `close`: Flush and release the sink (called at exit).
+    - `stats`: Return the recorded/dropped/written/failed counters.
+
+    """
+
+    def __init__(self, sink, queue_size=10000, batch_size=500, flush_interval=1.0,
+                 overflow_policy=DROP_NEWEST, block_timeout=0.05):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow_policy!r}; expected one of {OVERFLOW_POLICIES}.")
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._counters = {'recorded': 0, 'dropped': 0, 'written': 0, 'failed': 0}
+
+    def record(self, event):
+        self._ensure_started()
+        try:
+            if self.overflow_policy == BLOCK:
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            if self.overflow_policy != DROP_OLDEST:
+                self._counters['dropped'] += 1
+                return False
+            try:
+                self._queue.get_nowait()
+                self._counters['dropped'] += 1
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self._counters['dropped'] += 1
+                return False
+        self._counters['recorded'] += 1
+        return True
+
+    def flush(self):
+        with self._flush_lock:
+            while True:
+                batch = []
+                try:
+                    while len(batch) < self.batch_size:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    pass
+                if not batch:
+                    return
+                try:
+                    self.sink.write(batch)
+                    self._counters['written'] += len(batch)
+                except Exception:
+                    self._counters['failed'] += len(batch)
+                    logger.exception("Could not write %d auth events.", len(batch))
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+
+    def stats(self):
+        return dict(self._counters, queued=self._queue.qsize())
+
+    def _ensure_started(self):
+        # the flusher is started on first use so that management commands and migrations never spawn it
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='auth-event-log', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+            # the flusher thread owns its database connection; recycle it like a request would
+            close_old_connections()
+
+
+_auth_event_log = None
+_auth_event_log_lock = threading.Lock()
+
+
+def get_auth_event_log():
+    """
+    Return the process-wide auth event log configured by the `AUTH_EVENT_LOG` setting.
+    """
+    global _auth_event_log
+    if _auth_event_log is None:
+        with _auth_event_log_lock:
+            if _auth_event_log is None:
+                config = dict(DEFAULTS, **getattr(settings, 'AUTH_EVENT_LOG', {}))
+                if config['SINK'] == 'jsonl':
+                    sink = JsonlFileSink(config['PATH'], config['MAX_BYTES'], config['BACKUP_COUNT'])
+                else:
+                    sink = DatabaseSink()
+                _auth_event_log = AuthEventLog(
+                    sink,
+                    queue_size=config['QUEUE_SIZE'],
+                    batch_size=config['BATCH_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    overflow_policy=config['OVERFLOW_POLICY'],
+                    block_timeout=config['BLOCK_TIMEOUT'],
+                )
+    return _auth_event_log
+
+
+def record_auth_event(event_type, request=None, email='', firebase_uid=None, success=True, **metadata):
+    """
+    Record an auth event without blocking the request.
+
+    Args:
+    - `event_type` (str): One of the `AuthEvent.EVENT_TYPES` values.
+    - `request` (Request): The request the event belongs to, used for ip address and user agent.
+    - `email` (str): The email the event is about.
+    - `firebase_uid` (str): The firebase uid the event is about, when known.
+    - `success` (bool): Whether the action succeeded.
+    - `metadata`: Extra JSON-serializable details.
+
+    """
+    if not getattr(settings, 'AUTH_EVENT_LOG', {}).get('ENABLED', DEFAULTS['ENABLED']):
+        return False
+    meta = request.META if request is not None else {}
+    return get_auth_event_log().record({
+        'event_type': event_type,
+        'success': success,
+        'email': email or '',
+        'firebase_uid': firebase_uid,
+        'ip_address': meta.get('REMOTE_ADDR') or None,
+        'user_agent': meta.get('HTTP_USER_AGENT', '')[:255],
+        'metadata': metadata,
+        'created_at': timezone.now(),
+    })
@@ -0,0 +1,82 @@
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from accounts.models import User
+from accounts.serializers import UserReadSerializer
+
+
+DEFAULTS = {
+    'MAX_IDS': 500,
+    # results for more than this many keys are streamed instead of built in memory
+    'STREAM_THRESHOLD': 100,
+    'CHUNK_SIZE': 200,
+}
+
+
+def get_bulk_lookup_config():
+    return dict(DEFAULTS, **getattr(settings, 'USER_BULK_LOOKUP', {}))
+
+
+def _lookup_key(key, field):
+    if field != 'id':
+        return key
+    try:
+        return str(uuid.UUID(key))
+    except ValueError:
+        return None
+
+
+def lookup_users(keys, field='id', project_id=None, tenant_id=None):
+    """
+    Resolve users by id or firebase uid with a single query.
+
+    Args:
+    - `keys` (list): Distinct requested ids or firebase uids (strings), as the client sent them.
+    - `field` (str): `id` or `firebase_uid`.
+    - `project_id` (str): Project of the firebase uids, None for the default project.
+    - `tenant_id` (str): Tenant of the firebase uids, if any.
+
+    Returns:
+    - generator: `(requested_key, user)` pairs, `user` being the serialized user or None when
+      no active user matches. Found users come first, as the query returns them.
+
+    """
+    config = get_bulk_lookup_config()
+    # ids are matched whatever their case or dashes; several spellings of one id all get the user
+    requested = {}
+    for key in keys:
+        lookup_key = _lookup_key(key, field)
+        if lookup_key is not None:
+            requested.setdefault(lookup_key, []).append(key)
+
+    # firebase uids are only unique within one project and tenant
+    scope = {'firebase_project_id': project_id, 'firebase_tenant_id': tenant_id} if field == 'firebase_uid' else {}
+    found = set()
+    if requested:
+        rows = User.objects.filter(**{f'{field}__in': list(requested)}, pending_deletion=False, **scope) \
+            .values(*UserReadSerializer.fields).iterator(chunk_size=config['CHUNK_SIZE'])
+        for row in rows:
+            user = UserReadSerializer.to_representation(row)
+            lookup_key = user[field]
+            found.add(lookup_key)
+            for key in requested[lookup_key]:
+                yield key, user
+
+    for key in keys:
+        if _lookup_key(key, field) not in found:
+            yield key, None
+
+
+def stream_lookup_json(pairs, message):
+    """
+    Yield the lookup response as JSON chunks, one user at a time.
+    """
+    encoder = DjangoJSONEncoder()
+    yield '{"status": "success", "message": %s, "data": {"users": {' % encoder.encode(message)
+    separator = ''
+    for key, user in pairs:
+        yield f'{separator}{encoder.encode(key)}: {encoder.encode(user)}'
+        separator = ', '
+    yield '}}}'
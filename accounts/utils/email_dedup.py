@@ -0,0 +1,75 @@
+import hashlib
+import logging
+
+from django.conf import settings
+
+from .emails import normalize_lookup_email
+from .metrics import metrics
+from .shared_claims import claim_key, release_key
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    # repeated requests for the same email and action within this many seconds send nothing
+    'WINDOW': 60,
+    # claims go to this cache when it is shared by every web process (see CACHE_URL), otherwise to the database
+    'CACHE': 'default',
+}
+
+VERIFY_EMAIL = 'verify_email'
+PASSWORD_RESET = 'password_reset'
+
+
+def get_email_dedup_config():
+    return dict(DEFAULTS, **getattr(settings, 'EMAIL_DEDUP', {}))
+
+
+def _dedup_key(email, action):
+    digest = hashlib.sha256(normalize_lookup_email(email).encode()).hexdigest()
+    return f'email_dedup:{action}:{digest}'
+
+
+def claim_email_send(email, action):
+    """
+    Claim the right to enqueue an `action` email for `email`.
+
+    The claim is an atomic set-if-absent in the shared cache, or a unique row in the database
+    when no shared cache is configured (see `accounts.utils.shared_claims`), so among the
+    concurrent requests of every process exactly one wins and later ones inside the window
+    are coalesced into it. Outcomes are counted in `metrics`, served by the `metrics/` endpoint.
+
+    Args:
+    - `email` (str): Recipient address.
+    - `action` (str): `VERIFY_EMAIL` or `PASSWORD_RESET`.
+
+    Returns:
+    - bool: True if the caller should enqueue the email, False if an identical one already was.
+
+    """
+    config = get_email_dedup_config()
+    if not config['ENABLED']:
+        return True
+    try:
+        claimed = claim_key(_dedup_key(email, action), config['WINDOW'], config['CACHE'])
+    except Exception:
+        # an unreachable cache or database must not stop emails from being sent
+        logger.warning("Could not deduplicate %s email; sending it anyway.", action, exc_info=True)
+        metrics.increment(f'email_dedup.{action}.errors')
+        return True
+    metrics.increment(f'email_dedup.{action}.enqueued' if claimed else f'email_dedup.{action}.suppressed')
+    return claimed
+
+
+def release_email_send(email, action):
+    """
+    Drop a claim whose email could not be enqueued, so that the user's retry is not suppressed.
+    """
+    config = get_email_dedup_config()
+    if not config['ENABLED']:
+        return
+    try:
+        release_key(_dedup_key(email, action), config['CACHE'])
+    except Exception:
+        logger.warning("Could not release %s email claim.", action, exc_info=True)
@@ -0,0 +1,227 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Max
+
+from .emails import normalize_lookup_email
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'FALSE_POSITIVE_RATE': 0.01,
+    'MIN_CAPACITY': 10000,
+    # size the filter for this many times the current row count so that it survives growth until the next rebuild
+    'CAPACITY_HEADROOM': 2.0,
+    'MAX_BYTES': 16 * 1024 * 1024,
+    'REBUILD_INTERVAL': 300,
+    'SYNC_INTERVAL': 5,
+}
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    A negative answer is always correct; a positive answer is wrong with probability
+    close to `false_positive_rate` while the filter holds at most `capacity` items.
+
+    Attributes:
+    - `size` (int): Number of bits.
+    - `hash_count` (int): Number of bit positions per item.
+
+    """
+
+    def __init__(self, capacity, false_positive_rate=0.01, max_bytes=None):
+        capacity = max(int(capacity), 1)
+        size = math.ceil(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2))
+        if max_bytes:
+            size = min(size, max_bytes * 8)
+        self.size = max(size, 8)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def nbytes(self):
+        return len(self._bits)
+
+    def expected_false_positive_rate(self):
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+
+class EmailLookupFilter:
+    """
+    Negative-lookup layer for `User` by email, answering most misses without a query.
+
+    The filter is built from the user table on first use and rebuilt in the background every
+    `REBUILD_INTERVAL` seconds. Between rebuilds it stays current through `post_save` in this
+    process, and picks up users created or given a new email by other processes from the user
+    change log (`accounts.change_feed`), reading the changes after the last cursor it has seen
+    at most every `SYNC_INTERVAL` seconds. Rows written with `QuerySet.update()` are not logged
+    and are only seen after the next rebuild.
+
+    Methods:
+    - `might_exist`: False when no user can have this email.
+    - `add`: Record an email that now exists.
+    - `stats`: Size and hit counters.
+
+    """
+
+    def __init__(self):
+        self._filter = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._sync_mark = None
+        self._pending = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._rebuilding = False
+        self._counters = {'lookups': 0, 'negatives': 0, 'rebuilds': 0}
+
+    @property
+    def config(self):
+        return dict(DEFAULTS, **getattr(settings, 'EMAIL_LOOKUP_FILTER', {}))
+
+    def might_exist(self, email):
+        """
+        Return False only when no user can have `email`; True means the database must be asked.
+        """
+        config = self.config
+        # anything that is not an email string is left for the caller to reject
+        if not config['ENABLED'] or not email or not isinstance(email, str):
+            return True
+        self._counters['lookups'] += 1
+        if self._filter is None:
+            with self._build_lock:
+                if self._filter is None:
+                    with self._lock:
+                        self._pending = []
+                    self._rebuild(config)
+        else:
+            self._maybe_refresh(config)
+        if normalize_lookup_email(email) in self._filter:
+            return True
+        self._counters['negatives'] += 1
+        return False
+
+    def add(self, email):
+        if not email or not isinstance(email, str):
+            return
+        key = normalize_lookup_email(email)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(key)
+            if self._filter is not None:
+                self._filter.add(key)
+
+    def stats(self):
+        bloom = self._filter
+        if bloom is None:
+            return dict(self._counters, built=False)
+        return dict(
+            self._counters,
+            built=True,
+            items=bloom.count,
+            capacity=bloom.capacity,
+            bits=bloom.size,
+            bytes=bloom.nbytes,
+            hash_count=bloom.hash_count,
+            expected_false_positive_rate=bloom.expected_false_positive_rate(),
+        )
+
+    def _maybe_refresh(self, config):
+        now = time.monotonic()
+        if now - self._built_at > config['REBUILD_INTERVAL'] and not self._rebuilding:
+            with self._lock:
+                if self._rebuilding:
+                    return
+                self._rebuilding = True
+            threading.Thread(target=self._rebuild_in_background, args=(config,), daemon=True).start()
+        elif now - self._synced_at > config['SYNC_INTERVAL'] and self._sync_lock.acquire(blocking=False):
+            # one request per interval pays for the incremental query; the rest never wait for it
+            try:
+                self._sync(config)
+            finally:
+                self._sync_lock.release()
+
+    def _sync(self, config):
+        from accounts.change_feed import sequence_changes
+        from accounts.models import UserChange
+        with self._lock:
+            bloom, mark = self._filter, self._sync_mark
+        sequence_changes()
+        keys = []
+        for sequence, data in UserChange.objects.filter(sequence__gt=mark).values_list('sequence', 'data'):
+            mark = max(mark, sequence)
+            if data.get('email'):
+                keys.append(normalize_lookup_email(data['email']))
+        with self._lock:
+            for key in keys:
+                bloom.add(key)
+            # a rebuild that replaced the filter meanwhile has its own, newer mark
+            if self._filter is bloom:
+                self._sync_mark = mark
+        self._synced_at = time.monotonic()
+
+    def _rebuild_in_background(self, config):
+        try:
+            with self._lock:
+                self._pending = []
+            self._rebuild(config)
+        except Exception:
+            logger.exception("Could not rebuild the email lookup filter.")
+        finally:
+            self._rebuilding = False
+            close_old_connections()
+
+    def _rebuild(self, config):
+        from accounts.change_feed import sequence_changes
+        from accounts.models import User, UserChange
+        # changes numbered after this mark are picked up by the next sync, whether or not the scan saw them
+        sequence_changes()
+        mark = UserChange.objects.aggregate(mark=Max('sequence'))['mark'] or 0
+        rows = User.objects.count()
+        bloom = BloomFilter(
+            max(config['MIN_CAPACITY'], rows * config['CAPACITY_HEADROOM']),
+            config['FALSE_POSITIVE_RATE'],
+            config['MAX_BYTES'],
+        )
+        for email in User.objects.values_list('email', flat=True).iterator(chunk_size=10000):
+            bloom.add(normalize_lookup_email(email))
+        with self._lock:
+            # emails saved while the table was being scanned
+            for key in self._pending or ():
+                bloom.add(key)
+            self._pending = None
+            # the mark is set with the filter, so a sync never sees a filter without one
+            self._sync_mark = mark
+            self._filter = bloom
+        self._built_at = self._synced_at = time.monotonic()
+        self._counters['rebuilds'] += 1
+
+
+email_lookup_filter = EmailLookupFilter()
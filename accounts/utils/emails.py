@@ -0,0 +1,5 @@
+def normalize_lookup_email(email):
+    """
+    Return the form emails are compared in: surrounding whitespace removed, lowercased.
+    """
+    return email.strip().lower()
@@ -0,0 +1,68 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+# upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+
+class Metrics:
+    """
+    Process-local counters and latency histograms.
+
+    Methods:
+    - `increment`: Add to a named counter.
+    - `observe`: Record a duration, in seconds, under a name.
+    - `timed`: Context manager that observes the duration of its block.
+    - `snapshot`: Return every counter and latency summary.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._latencies = {}
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            latency = self._latencies.get(name)
+            if latency is None:
+                latency = self._latencies[name] = {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * len(LATENCY_BUCKETS_MS),
+                }
+            latency['count'] += 1
+            latency['total_ms'] += elapsed_ms
+            latency['max_ms'] = max(latency['max_ms'], elapsed_ms)
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    latency['buckets'][i] += 1
+                    break
+
+    @contextmanager
+    def timed(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = {
+                name: dict(
+                    latency,
+                    mean_ms=latency['total_ms'] / latency['count'],
+                    buckets=dict(zip(map(str, LATENCY_BUCKETS_MS), latency['buckets'])),
+                )
+                for name, latency in self._latencies.items()
+            }
+            return {'counters': dict(self._counters), 'latencies': latencies}
+
+
+metrics = Metrics()
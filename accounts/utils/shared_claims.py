@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+
+# caches whose add() is not an atomic set-if-absent shared by every web process
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache, FileBasedCache)
+
+
+def is_shared_cache(cache_alias):
+    return not isinstance(caches[cache_alias], PROCESS_LOCAL_CACHES)
+
+
+def claim_key(key, timeout, cache_alias='default'):
+    """
+    Atomically claim `key` for `timeout` seconds, across every process.
+
+    The claim is a `cache.add` when `cache_alias` is a shared cache (redis, memcached), and
+    otherwise the insert of a `SharedClaim` row, whose unique key lets exactly one of
+    concurrent claimants win.
+
+    Args:
+    - `key` (str): The key to claim.
+    - `timeout` (int): Seconds the claim is held.
+    - `cache_alias` (str): Cache used when it is shared by every process.
+
+    Returns:
+    - bool: True if the caller now holds the claim, False if someone else does.
+
+    """
+    if is_shared_cache(cache_alias):
+        return caches[cache_alias].add(key, True, timeout=timeout)
+
+    from accounts.models import SharedClaim
+    now = timezone.now()
+    # expired claims are removed by whoever claims next; only they can stand in the way of this insert
+    SharedClaim.objects.filter(expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            SharedClaim.objects.create(key=key, expires_at=now + timedelta(seconds=timeout))
+    except IntegrityError:
+        return False
+    return True
+
+
+def release_key(key, cache_alias='default'):
+    """
+    Drop a claim before it expires.
+    """
+    if is_shared_cache(cache_alias):
+        caches[cache_alias].delete(key)
+        return
+    from accounts.models import SharedClaim
+    SharedClaim.objects.filter(key=key).delete()
@@ -0,0 +1,142 @@
+import asyncio
+import copy
+import threading
+
+
+class _Call:
+    """
+    A single in-flight computation shared by every caller of the same key.
+    """
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _copy_error(error):
+    """
+    Return a copy of `error` for a caller that joined the call, chained to the original.
+
+    Raising one exception object in several threads would have them share, and extend, one
+    traceback. Exceptions that cannot be rebuilt from their args are raised as they are.
+    """
+    try:
+        fresh = copy.copy(error)
+    except Exception:
+        return error
+    fresh.__cause__ = error
+    return fresh
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution (threaded mode).
+
+    The first caller of a key runs the function; callers that arrive while it is
+    still running wait for it and receive the same result, or a copy of the same exception.
+    Nothing is cached once the call has finished. The result object is shared, so callers
+    must not mutate it; share immutable values and build per-caller objects from them.
+
+    Attributes:
+    - `name` (str): Name used when reporting the counters.
+
+    Methods:
+    - `do`: Run `fn` for `key`, or join the call already in flight.
+    - `stats`: Return the calls/executions/coalesced counters.
+
+    """
+
+    def __init__(self, name='single_flight'):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {'calls': 0, 'executions': 0, 'coalesced': 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` once for all concurrent callers of `key`.
+
+        Args:
+        - `key` (hashable): Identifies identical calls.
+        - `fn` (callable): The computation to share.
+
+        Returns:
+        - The value returned by `fn`.
+
+        """
+        with self._lock:
+            self._counters['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._counters['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._counters['executions'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise _copy_error(call.error)
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, in_flight=len(self._calls))
+
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent awaits for the same key into one execution (async mode).
+
+    Same contract as `SingleFlight`, for coroutine functions running on one event loop.
+    """
+
+    def __init__(self, name='async_single_flight'):
+        self.name = name
+        self._futures = {}
+        self._counters = {'calls': 0, 'executions': 0, 'coalesced': 0}
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Await `fn(*args, **kwargs)` once for all concurrent callers of `key`.
+
+        Args:
+        - `key` (hashable): Identifies identical calls.
+        - `fn` (coroutine function): The computation to share.
+
+        Returns:
+        - The value returned by `fn`.
+
+        """
+        self._counters['calls'] += 1
+        future = self._futures.get(key)
+        if future is not None:
+            self._counters['coalesced'] += 1
+            try:
+                # shield so that one cancelled waiter does not cancel the shared call
+                return await asyncio.shield(future)
+            except Exception as error:
+                raise _copy_error(error)
+
+        self._counters['executions'] += 1
+        future = self._futures[key] = asyncio.ensure_future(fn(*args, **kwargs))
+        future.add_done_callback(lambda _: self._futures.pop(key, None))
+        return await asyncio.shield(future)
+
+    def stats(self):
+        return dict(self._counters, in_flight=len(self._futures))
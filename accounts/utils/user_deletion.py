@@ -0,0 +1,156 @@
+import time
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.firebase_auth.firebase_authentication import auth as firebase_admin_auth
+from accounts.firebase_auth.revocation import revocation_cache, ALWAYS_REVOKED
+from accounts.models import User
+from accounts.utils.shared_claims import claim_key, release_key
+
+
+# celery logger
+logger = get_task_logger(__name__)
+
+DEFAULTS = {
+    # auth.delete_users accepts at most 1000 uids per call
+    'BATCH_SIZE': 1000,
+    # delete_users is rate limited by firebase; pause between batches
+    'BATCH_INTERVAL': 1.0,
+    'MAX_ATTEMPTS': 5,
+    # seconds a deletion request waits so that requests arriving together share a batch
+    'SCHEDULE_DELAY': 30,
+}
+
+
+def get_user_deletion_config():
+    return dict(DEFAULTS, **getattr(settings, 'USER_DELETION', {}))
+
+
+def request_user_deletion(user):
+    """
+    Mark a user as pending deletion and schedule the batch worker; returns immediately.
+
+    The account is deactivated and disabled on firebase: this process rejects its tokens
+    right away, other processes once their revocation state for the uid is refreshed, and
+    firebase refuses new sign-ins and token refreshes. Firebase and database removal happen
+    in the next batch.
+
+    Returns:
+    - bool: False when no batch run could be scheduled; the user stays pending and is
+      deleted by the next run (or `python manage.py delete_users --pending-only`).
+
+    """
+    user.pending_deletion = True
+    user.is_active = False
+    user.deletion_requested_at = timezone.now()
+    user.save(update_fields=['pending_deletion', 'is_active', 'deletion_requested_at'])
+    if user.firebase_uid:
+        revocation_cache.mark_revoked(user.firebase_uid, ALWAYS_REVOKED)
+        try:
+            firebase_admin_auth.update_user(user.firebase_uid, disabled=True)
+        except Exception:
+            logger.warning("Could not disable firebase user %s pending deletion.", user.firebase_uid, exc_info=True)
+    return schedule_pending_deletions()
+
+
+def schedule_pending_deletions():
+    """
+    Schedule a batch run in `SCHEDULE_DELAY` seconds, unless one already is.
+
+    Returns:
+    - bool: False when the run could not be handed to celery.
+
+    """
+    delay = get_user_deletion_config()['SCHEDULE_DELAY']
+    # at most one scheduled run per delay window, whatever the number of requests and processes
+    if not claim_key('user_deletion:scheduled', delay):
+        return True
+    try:
+        delete_pending_users.apply_async(countdown=delay)
+    except Exception:
+        release_key('user_deletion:scheduled')
+        logger.exception("Could not schedule the deletion of pending users; they are deleted by the next run.")
+        return False
+    return True
+
+
+def process_pending_deletions(batch_size=None, progress=None):
+    """
+    Delete every pending user from firebase and the database, in batches.
+
+    Each batch is one `auth.delete_users` call and one bulk delete of the rows firebase
+    confirmed. Uids firebase could not delete stay pending with their attempt count
+    increased, until `MAX_ATTEMPTS` is reached.
+
+    Args:
+    - `batch_size` (int): Uids per batch, at most 1000.
+    - `progress` (callable): Called with the running totals after each batch.
+
+    Returns:
+    - dict: `total`, `processed`, `deleted` and `failed` counts.
+
+    """
+    config = get_user_deletion_config()
+    batch_size = min(batch_size or config['BATCH_SIZE'], 1000)
+    pending = User.objects.filter(pending_deletion=True, deletion_attempts__lt=config['MAX_ATTEMPTS'])
+    totals = {'total': pending.count(), 'processed': 0, 'deleted': 0, 'failed': 0}
+
+    last_pk = None
+    while True:
+        # keyset pagination, so that users that failed in this run are not picked up again
+        page = pending.order_by('pk')
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        batch = list(page.values_list('pk', 'firebase_uid')[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        uids = [uid for _, uid in batch if uid]
+        failed_uids = set()
+        if uids:
+            try:
+                result = firebase_admin_auth.delete_users(uids)
+                for error in result.errors:
+                    failed_uids.add(uids[error.index])
+                    logger.warning("Could not delete firebase user %s: %s", uids[error.index], error.reason)
+            except Exception:
+                logger.exception("Could not delete a batch of %d firebase users.", len(uids))
+                failed_uids = set(uids)
+
+        deleted_pks = [pk for pk, uid in batch if uid not in failed_uids]
+        failed_pks = [pk for pk, uid in batch if uid in failed_uids]
+        if deleted_pks:
+            User.objects.filter(pk__in=deleted_pks).delete()
+        if failed_pks:
+            User.objects.filter(pk__in=failed_pks).update(deletion_attempts=F('deletion_attempts') + 1)
+
+        totals['processed'] += len(batch)
+        totals['deleted'] += len(deleted_pks)
+        totals['failed'] += len(failed_pks)
+        logger.info("User deletion progress: %(processed)d/%(total)d processed, %(deleted)d deleted, "
+                    "%(failed)d failed", totals)
+        if progress is not None:
+            progress(dict(totals))
+        if len(batch) == batch_size:
+            time.sleep(config['BATCH_INTERVAL'])
+
+    return totals
+
+
+# delete pending users in batches using celery background task
+@shared_task(bind=True)
+def delete_pending_users(self, batch_size=None):
+    def report(totals):
+        if self.request.id:
+            self.update_state(state='PROGRESS', meta=totals)
+
+    totals = process_pending_deletions(batch_size, progress=report)
+    # failed uids are retried by the next run, until they run out of attempts
+    if totals['failed']:
+        schedule_pending_deletions()
+    return totals
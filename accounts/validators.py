@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext as _
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    # index built by `python manage.py compile_breached_passwords`; the check is skipped while it is missing
+    'PATH': None,
+}
+
+# file layout: header, 65537 little-endian uint64 fan-out offsets by the first two digest bytes, sorted prefixes
+MAGIC = b'BRCHPW01'
+HEADER = struct.Struct('<8sQI')
+FANOUT_ENTRIES = 65537
+FANOUT = struct.Struct(f'<{FANOUT_ENTRIES}Q')
+BUCKET_BOUNDS = struct.Struct('<2Q')
+
+
+def get_breached_passwords_config():
+    return dict(DEFAULTS, **getattr(settings, 'BREACHED_PASSWORDS', {}))
+
+
+class BreachedPasswordIndex:
+    """
+    Read-only, memory-mapped set of breached password SHA-1 digests.
+
+    The file holds the first `prefix_bytes` bytes of each digest, sorted, plus a fan-out
+    table of where each leading two-byte value starts. A lookup reads one fan-out entry
+    and binary searches a few dozen bytes of the mapped file, so it takes microseconds.
+    The mapping is backed by the page cache, so every worker process on a host shares
+    one copy and no worker loads the file into its own memory.
+
+    Attributes:
+    - `count` (int): Number of digests.
+    - `prefix_bytes` (int): Stored bytes per digest.
+
+    Methods:
+    - `contains_sha1`: Whether a SHA-1 digest is in the set.
+    - `contains_password`: Whether a password's SHA-1 digest is in the set.
+
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.prefix_bytes = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a breached password index.")
+        self._data_offset = HEADER.size + FANOUT.size
+        if len(self._mmap) != self._data_offset + self.count * self.prefix_bytes:
+            raise ValueError(f"{path} is truncated.")
+
+    def contains_sha1(self, digest):
+        prefix = digest[:self.prefix_bytes]
+        bucket = (prefix[0] << 8) | prefix[1]
+        # the fan-out table is read from the mapping too, so an open index holds no private memory
+        low, high = BUCKET_BOUNDS.unpack_from(self._mmap, HEADER.size + bucket * 8)
+        data, width, offset = self._mmap, self.prefix_bytes, self._data_offset
+        while low < high:
+            middle = (low + high) // 2
+            start = offset + middle * width
+            candidate = data[start:start + width]
+            if candidate < prefix:
+                low = middle + 1
+            elif candidate > prefix:
+                high = middle
+            else:
+                return True
+        return False
+
+    def contains_password(self, password):
+        return self.contains_sha1(hashlib.sha1(password.encode('utf-8')).digest())
+
+    def close(self):
+        self._mmap.close()
+
+
+_index = None
+_index_path = None
+_index_lock = threading.Lock()
+
+
+def get_breached_password_index():
+    """
+    Return the process-wide index for the `BREACHED_PASSWORDS` path, or None when there is no index.
+    """
+    global _index, _index_path
+    config = get_breached_passwords_config()
+    path = config['PATH']
+    if not config['ENABLED'] or not path:
+        return None
+    if _index_path != path:
+        with _index_lock:
+            if _index_path != path:
+                index = None
+                if os.path.exists(path):
+                    index = BreachedPasswordIndex(path)
+                else:
+                    logger.warning("Breached password index %s not found; passwords are not checked against it.", path)
+                _index, _index_path = index, path
+    return _index
+
+
+class BreachedPasswordValidator:
+    """
+    Reject passwords that appear in the compiled breached password index.
+    """
+
+    def validate(self, password, user=None):
+        index = get_breached_password_index()
+        if index is not None and index.contains_password(password):
+            raise ValidationError(
+                _("This password has appeared in a data breach. Please choose a different password."),
+                code='password_breached',
+            )
+
+    def get_help_text(self):
+        return _("Your password can't be one that has appeared in a known data breach.")
@@ -2,16 +2,33 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
-from .models import User
-from .serializers import UserSerializer, UserUpdateSerializer, UserEmailUpdateSerializer
+from .models import User, AuthEvent
+from .serializers import UserSerializer, UserReadSerializer, UserUpdateSerializer, UserEmailUpdateSerializer
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from .firebase_auth.firebase_authentication import FirebaseAuthentication
+from .firebase_auth.firebase_authentication import FirebaseAuthentication, FirebaseClaimsAuthentication
+from .firebase_auth.firebase_authentication import InternalTokenAuthentication
+from .firebase_auth.internal_tokens import mint_internal_token
 from .firebase_auth.firebase_authentication import auth as firebase_admin_auth
+from .firebase_auth.firebase_authentication import verify_id_token
+from .firebase_auth.tenants import firebase_tenants
+from .firebase_auth.securetoken import get_securetoken_client, SecureTokenError
 from .utils.custom_email_verification_link import generate_custom_email_from_firebase
 from .utils.custom_password_reset_link import generate_custom_password_link_from_firebase
-from django.contrib.auth.hashers import check_password
+from .utils.auth_event_log import record_auth_event
+from .utils.email_lookup_filter import email_lookup_filter
+from .utils.email_dedup import claim_email_send, release_email_send, VERIFY_EMAIL, PASSWORD_RESET
+from .hashers import sync_mirror_password
+from .validators import BreachedPasswordValidator
+from django.core.exceptions import ValidationError
+from .utils.metrics import metrics
+from .utils.user_deletion import request_user_deletion
+from .permissions import HasStaffClaim
+from .change_feed import fetch_changes
+from .utils.bulk_lookup import get_bulk_lookup_config, lookup_users, stream_lookup_json
+from django.http import StreamingHttpResponse
+import os
 import re
 from drf_with_firebase_auth.settings import auth
 
@@ -68,7 +85,18 @@ class AuthCreateNewUserView(APIView):
                 "message": "Password must contain at least one uppercase letter, one lowercase letter, one digit, and one special character."
             }
             return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
+        # Check that the password is not a known breached password, before the firebase user is created
+        try:
+            BreachedPasswordValidator().validate(password)
+        except ValidationError as e:
+            bad_response = {
+                "status": "failed",
+                "message": e.messages[0]
+            }
+            return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
         
+        # set once this request holds the verification email claim, which every failure below gives back
+        claimed = False
         try:
             # create user on firebase
             user = auth.create_user_with_email_and_password(email, password)
@@ -81,8 +109,14 @@ class AuthCreateNewUserView(APIView):
             try:
                 user_email = email
                 display_name = first_name.capitalize()
-                generate_custom_email_from_firebase.delay(user_email, display_name)
+                # a verification email already queued for this address in the dedup window is not sent again
+                coalesced = not claim_email_send(user_email, VERIFY_EMAIL)
+                claimed = not coalesced
+                if not coalesced:
+                    generate_custom_email_from_firebase.delay(user_email, display_name)
             except Exception:
+                if claimed:
+                    release_email_send(email, VERIFY_EMAIL)
                 # delete user from firebase if email verification link could not be sent
                 firebase_admin_auth.delete_user(uid)
                 bad_response = {
@@ -94,6 +128,7 @@ class AuthCreateNewUserView(APIView):
             serializer = UserSerializer(data=data)
             if serializer.is_valid():
                 serializer.save()
+                record_auth_event(AuthEvent.SIGN_UP, request, email=email, firebase_uid=uid, coalesced=coalesced)
                 response = {
                     "status": "success",
                     "message": "User created successfully.",
@@ -102,6 +137,10 @@ class AuthCreateNewUserView(APIView):
                 return Response(response, status=status.HTTP_201_CREATED)
             else:
                 auth.delete_user_account(user['idToken'])
+                if claimed:
+                    release_email_send(email, VERIFY_EMAIL)
+                record_auth_event(AuthEvent.SIGN_UP, request, email=email, firebase_uid=uid, success=False,
+                                  reason='invalid_data')
                 bad_response = {
                     "status": "failed",
                     "message": "User signup failed.",
@@ -110,6 +149,9 @@ class AuthCreateNewUserView(APIView):
                 return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
            
         except Exception as e:
+            if claimed:
+                release_email_send(email, VERIFY_EMAIL)
+            record_auth_event(AuthEvent.SIGN_UP, request, email=email, success=False, reason='firebase_error')
             bad_response = {
                 "status": "failed",
                 "message": str(e)
@@ -142,9 +184,21 @@ class AuthLoginExisitingUserView(APIView):
         email = data.get('email')
         password = data.get('password')
 
+        # unknown emails are rejected without asking firebase or the database
+        if not email_lookup_filter.might_exist(email):
+            record_auth_event(AuthEvent.SIGN_IN_FAILED, request, email=email, success=False,
+                              reason='unknown_email')
+            bad_response = {
+                "status": "failed",
+                "message": "Invalid email or password."
+            }
+            return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             user = auth.sign_in_with_email_and_password(email, password)
         except Exception:
+            record_auth_event(AuthEvent.SIGN_IN_FAILED, request, email=email, success=False,
+                              reason='invalid_credentials')
             bad_response = {
                 "status": "failed",
                 "message": "Invalid email or password."
@@ -152,14 +206,22 @@ class AuthLoginExisitingUserView(APIView):
             return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            existing_user = User.objects.get(email=email)
+            existing_user = User.objects.get_by_email(email)
+            if existing_user.pending_deletion:
+                # the firebase account is removed with it by the deletion batch
+                record_auth_event(AuthEvent.SIGN_IN_FAILED, request, email=email, firebase_uid=user['localId'],
+                                  success=False, reason='pending_deletion')
+                bad_response = {
+                    "status": "failed",
+                    "message": "User does not exist."
+                }
+                return Response(bad_response, status=status.HTTP_404_NOT_FOUND)
             
-            # update password if it is not the same as the one in the database
-            if not check_password(password, existing_user.password):
-                existing_user.set_password(password)
-                existing_user.save()
+            # update the mirrored password if it differs, or upgrade it to the configured hashing profile
+            sync_mirror_password(existing_user, password)
             
-            serializer = UserSerializer(existing_user)
+            record_auth_event(AuthEvent.SIGN_IN, request, email=email, firebase_uid=user['localId'])
+            serializer = UserReadSerializer(existing_user)
             extra_data = {
                 "firebase_id": user['localId'],
                 "firebase_access_token": user['idToken'],
@@ -176,19 +238,130 @@ class AuthLoginExisitingUserView(APIView):
             return Response(response, status=status.HTTP_200_OK)
         except User.DoesNotExist:
             auth.delete_user_account(user['idToken'])
+            record_auth_event(AuthEvent.SIGN_IN_FAILED, request, email=email, firebase_uid=user['localId'],
+                              success=False, reason='user_not_found')
+            bad_response = {
+                "status": "failed",
+                "message": "User does not exist."
+            }
+            return Response(bad_response, status=status.HTTP_404_NOT_FOUND)
+
+
+class AuthRefreshTokenView(APIView):
+    """
+    API endpoint to exchange a firebase refresh token for a new ID token.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    @swagger_auto_schema(
+        operation_summary="Refresh a user's firebase ID token",
+        operation_description="Exchange the firebase refresh token returned at sign in for a new ID token.",
+        tags=["User Management"],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'refresh_token': openapi.Schema(type=openapi.TYPE_STRING, description='Firebase refresh token')
+            }
+        ),
+        responses={200: "Token refreshed successfully.", 400: "Invalid refresh token.", 502: "Token refresh failed."}
+    )
+    def post(self, request: Request):
+        with metrics.timed('endpoint.auth_refresh'):
+            refresh_token = request.data.get('refresh_token')
+            if not refresh_token:
+                bad_response = {
+                    "status": "failed",
+                    "message": "refresh token is required."
+                }
+                return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                tokens = get_securetoken_client().refresh(refresh_token)
+            except SecureTokenError as e:
+                if e.status_code is None or e.status_code >= 500:
+                    bad_response = {
+                        "status": "failed",
+                        "message": "Token refresh failed; Please try again."
+                    }
+                    return Response(bad_response, status=status.HTTP_502_BAD_GATEWAY)
+                bad_response = {
+                    "status": "failed",
+                    "message": "Invalid refresh token."
+                }
+                return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
+
+            # warm the verified-token and revocation caches for the requests that will carry the new token
+            try:
+                decoded_token = verify_id_token(tokens['id_token'], host=request.META.get('HTTP_HOST'))
+                firebase_tenants.revocation_cache_for(decoded_token).is_revoked(decoded_token)
+            except Exception:
+                metrics.increment('auth_refresh.warm_errors')
+
+            response = {
+                "status": "success",
+                "message": "Token refreshed successfully.",
+                "data": {
+                    "firebase_id": tokens.get('user_id'),
+                    "firebase_access_token": tokens['id_token'],
+                    "firebase_refresh_token": tokens.get('refresh_token'),
+                    "firebase_expires_in": tokens.get('expires_in'),
+                }
+            }
+            return Response(response, status=status.HTTP_200_OK)
+
+
+class AuthInternalTokenView(APIView):
+    """
+    API endpoint to exchange a firebase ID token for a short-lived internal access token.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [FirebaseClaimsAuthentication]
+
+    @swagger_auto_schema(
+        operation_summary="Exchange a firebase ID token for an internal access token",
+        operation_description="Verify the firebase ID token once and return an HMAC-signed internal token, valid for a "
+                              "few minutes, that services present to each other instead of the firebase token.",
+        tags=["User Management"],
+        responses={200: "Internal token issued successfully.", 404: "User does not exist.",
+                   503: "Internal tokens are not configured."}
+    )
+    def post(self, request: Request):
+        try:
+            user_id = request.user.pk
+        except Exception:
             bad_response = {
                 "status": "failed",
                 "message": "User does not exist."
             }
             return Response(bad_response, status=status.HTTP_404_NOT_FOUND)
 
+        try:
+            internal_token, expires_in = mint_internal_token(request.auth, user_id)
+        except ValueError:
+            bad_response = {
+                "status": "failed",
+                "message": "Internal tokens are not configured."
+            }
+            return Response(bad_response, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        response = {
+            "status": "success",
+            "message": "Internal token issued successfully.",
+            "data": {
+                "internal_token": internal_token,
+                "expires_in": expires_in,
+            }
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
 
 class RetrieveUpdateDestroyExistingUser(APIView):
     """
     API endpoint to retrieve, update, or delete an existing user.
     """
     permission_classes = [IsAuthenticated]
-    authentication_classes = [FirebaseAuthentication]
+    authentication_classes = [InternalTokenAuthentication, FirebaseAuthentication]
 
     @swagger_auto_schema(
         operation_summary="Retrieve details of an existing user",
@@ -198,9 +371,8 @@ class RetrieveUpdateDestroyExistingUser(APIView):
     )
     def get(self, request: Request, pk: int):
         try:
-            user_firebase_access_token = request.META.get('HTTP_AUTHORIZATION').split(' ').pop()
-            decode_access_token = firebase_admin_auth.verify_id_token(user_firebase_access_token)
-            user_firebase_uid = decode_access_token.get('uid')
+            # the token was already verified by FirebaseAuthentication; its claims are request.auth
+            user_firebase_uid = request.auth.get('uid')
         except Exception:
             bad_response = {
                 "status": "failed",
@@ -209,7 +381,8 @@ class RetrieveUpdateDestroyExistingUser(APIView):
             return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            user = User.objects.get(pk=pk, firebase_uid=user_firebase_uid)
+            # only the serialized columns are fetched; no model instance is built
+            user = User.objects.values(*UserReadSerializer.fields).get(pk=pk, pending_deletion=False, **firebase_tenants.user_filter(request.auth))
         except User.DoesNotExist:
             bad_response = {
                 "status": "failed",
@@ -223,7 +396,7 @@ class RetrieveUpdateDestroyExistingUser(APIView):
             }
             return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = UserSerializer(user)
+        serializer = UserReadSerializer(user)
         response = {
             "status": "success",
             "message": "User retrieved successfully.",
@@ -241,9 +414,8 @@ class RetrieveUpdateDestroyExistingUser(APIView):
     def patch(self, request: Request, pk: int):
         data = request.data
         try:
-            user_firebase_access_token = request.META.get('HTTP_AUTHORIZATION').split(' ').pop()
-            decode_access_token = firebase_admin_auth.verify_id_token(user_firebase_access_token)
-            user_firebase_uid = decode_access_token.get('uid')
+            # the token was already verified by FirebaseAuthentication; its claims are request.auth
+            user_firebase_uid = request.auth.get('uid')
         except Exception:
             bad_response = {
                 "status": "failed",
@@ -251,7 +423,7 @@ class RetrieveUpdateDestroyExistingUser(APIView):
             }
             return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
         try:
-            user = User.objects.get(pk=pk, firebase_uid=user_firebase_uid)
+            user = User.objects.get(pk=pk, pending_deletion=False, **firebase_tenants.user_filter(request.auth))
         except User.DoesNotExist:
             bad_response = {
                 "status": "failed",
@@ -292,15 +464,14 @@ class RetrieveUpdateDestroyExistingUser(APIView):
     
     @swagger_auto_schema(
         operation_summary="Delete an existing user",
-        operation_description="Delete an existing user both on firebase and django database  based on their primary key.",
+        operation_description="Schedule the deletion of an existing user both on firebase and django database based on their primary key.",
         tags=["User Management"],
-        responses={204: "User deleted successfully.", 404: "User does not exist."}
+        responses={202: "User deletion scheduled.", 404: "User does not exist."}
     )
     def delete(self, request: Request, pk):
         try:
-            user_firebase_access_token = request.META.get('HTTP_AUTHORIZATION').split(' ').pop()
-            decode_access_token = firebase_admin_auth.verify_id_token(user_firebase_access_token)
-            user_firebase_uid = decode_access_token.get('uid')
+            # the token was already verified by FirebaseAuthentication; its claims are request.auth
+            user_firebase_uid = request.auth.get('uid')
         except Exception:
             bad_response = {
                 "status": "failed",
@@ -309,21 +480,7 @@ class RetrieveUpdateDestroyExistingUser(APIView):
             return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            user = User.objects.get(pk=pk, firebase_uid=user_firebase_uid)
-            try:
-                firebase_admin_auth.delete_user(user_firebase_uid)
-            except Exception:
-                bad_response = {
-                    "status": "failed",
-                    "message": "User does not exist on firebase."
-                }
-                return Response(bad_response, status=status.HTTP_404_NOT_FOUND)
-            user.delete()
-            response = {
-                "status": "success",
-                "message": "User deleted successfully."
-            }
-            return Response(response, status=status.HTTP_204_NO_CONTENT)
+            user = User.objects.get(pk=pk, pending_deletion=False, **firebase_tenants.user_filter(request.auth))
         except User.DoesNotExist:
             bad_response = {
                 "status": "failed",
@@ -337,6 +494,120 @@ class RetrieveUpdateDestroyExistingUser(APIView):
             }
             return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            # firebase and database deletion happen in batches in the background
+            scheduled = request_user_deletion(user)
+        except Exception:
+            bad_response = {
+                "status": "failed",
+                "message": "User deletion could not be requested; Please try again."
+            }
+            return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
+        # the account is disabled and pending either way; an unscheduled one is deleted by the next run
+        response = {
+            "status": "success",
+            "message": "User deletion scheduled." if scheduled else "User deletion requested."
+        }
+        return Response(response, status=status.HTTP_202_ACCEPTED)
+
+
+class UserChangeFeedView(APIView):
+    """
+    API endpoint to pull the log of user changes after a cursor.
+    """
+    permission_classes = [HasStaffClaim]
+    authentication_classes = [InternalTokenAuthentication, FirebaseClaimsAuthentication]
+
+    @swagger_auto_schema(
+        operation_summary="List user changes after a cursor",
+        operation_description="List user creations, updates and deletions after the given cursor, oldest first. "
+                              "Pass the returned next_cursor to get the following page.",
+        tags=["User Management"],
+        manual_parameters=[
+            openapi.Parameter(name='cursor', in_=openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description='Cursor of the last change already seen'),
+            openapi.Parameter(name='limit', in_=openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description='Maximum number of changes to return'),
+        ],
+        responses={200: "User changes retrieved successfully.", 400: "cursor and limit must be integers."}
+    )
+    def get(self, request: Request):
+        try:
+            cursor = int(request.query_params.get('cursor', 0))
+            limit = int(request.query_params.get('limit', 0)) or None
+        except ValueError:
+            bad_response = {
+                "status": "failed",
+                "message": "cursor and limit must be integers."
+            }
+            return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
+
+        changes = fetch_changes(cursor, limit)
+        response = {
+            "status": "success",
+            "message": "User changes retrieved successfully.",
+            "data": {
+                "changes": changes,
+                "next_cursor": changes[-1]['cursor'] if changes else cursor,
+            }
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class UserBulkLookupView(APIView):
+    """
+    API endpoint to resolve many users by id or firebase uid in one request.
+    """
+    permission_classes = [HasStaffClaim]
+    authentication_classes = [InternalTokenAuthentication, FirebaseClaimsAuthentication]
+
+    @swagger_auto_schema(
+        operation_summary="Look up many users at once",
+        operation_description="Resolve up to USER_BULK_LOOKUP MAX_IDS users by `ids` or by `firebase_uids` with a single query. "
+                              "The result maps every requested value to the user, or to null when there is none.",
+        tags=["User Management"],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING),
+                                      description='User ids'),
+                'firebase_uids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING),
+                                                description='Firebase uids'),
+            }
+        ),
+        responses={200: "Users retrieved successfully.", 400: "Provide a list of ids or firebase_uids."}
+    )
+    def post(self, request: Request):
+        config = get_bulk_lookup_config()
+        data = request.data
+        field = 'id' if 'ids' in data else 'firebase_uid'
+        keys = data.get('ids', data.get('firebase_uids'))
+        if ('ids' in data) == ('firebase_uids' in data) or not isinstance(keys, list) \
+                or not all(isinstance(key, str) for key in keys):
+            bad_response = {
+                "status": "failed",
+                "message": "Provide a list of ids or firebase_uids."
+            }
+            return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
+        keys = list(dict.fromkeys(keys))
+        if len(keys) > config['MAX_IDS']:
+            bad_response = {
+                "status": "failed",
+                "message": f"At most {config['MAX_IDS']} users can be looked up at once."
+            }
+            return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
+
+        message = "Users retrieved successfully."
+        pairs = lookup_users(keys, field, *firebase_tenants.user_scope(request.auth))
+        if len(keys) > config['STREAM_THRESHOLD']:
+            return StreamingHttpResponse(stream_lookup_json(pairs, message), content_type='application/json')
+        response = {
+            "status": "success",
+            "message": message,
+            "data": {"users": dict(pairs)}
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
 
 class UpdateUserEmailAddressView(APIView):
     """
@@ -370,18 +641,35 @@ class UpdateUserEmailAddressView(APIView):
                 "message": "Enter a valid email address."
             }
             return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
+
+        # an account pending deletion keeps its email until it is removed
+        if User.objects.filter(firebase_uid=firebase_uid, firebase_project_id=None, firebase_tenant_id=None,
+                               pending_deletion=True).exists():
+            record_auth_event(AuthEvent.EMAIL_CHANGE, request, email=email, firebase_uid=firebase_uid,
+                              success=False, reason='pending_deletion')
+            bad_response = {
+                "status": "failed",
+                "message": "User does not exist."
+            }
+            return Response(bad_response, status=status.HTTP_404_NOT_FOUND)
         try:
             user = firebase_admin_auth.update_user(firebase_uid, email=email)
         except Exception:
+            record_auth_event(AuthEvent.EMAIL_CHANGE, request, email=email, firebase_uid=firebase_uid,
+                              success=False, reason='firebase_user_not_found')
             bad_response = {
                 "status": "failed",
                 "message": "User does not exist."
             }
             return Response(bad_response, status=status.HTTP_404_NOT_FOUND)
         try:
-            existing_user = User.objects.get(firebase_uid=firebase_uid)
+            # the firebase user was updated in the default project, so only that project's user changes
+            existing_user = User.objects.get(firebase_uid=firebase_uid, firebase_project_id=None, firebase_tenant_id=None)
+            previous_email = existing_user.email
             existing_user.email = email
             existing_user.save()
+            record_auth_event(AuthEvent.EMAIL_CHANGE, request, email=email, firebase_uid=firebase_uid,
+                              previous_email=previous_email)
             response = {
                 "status": "success",
                 "message": "User email updated successfully.",
@@ -389,6 +677,8 @@ class UpdateUserEmailAddressView(APIView):
             return Response(response, status=status.HTTP_200_OK)
         except User.DoesNotExist:
             auth.delete_user_account(user['idToken'])
+            record_auth_event(AuthEvent.EMAIL_CHANGE, request, email=email, firebase_uid=firebase_uid,
+                              success=False, reason='user_not_found')
             bad_response = {
                 "status": "failed",
                 "message": "User does not exist."
@@ -429,27 +719,60 @@ class UserPasswordResetView(APIView):
             return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            user = User.objects.get(email=email)
+            if not email_lookup_filter.might_exist(email):
+                raise User.DoesNotExist
+            user = User.objects.get_by_email(email)
             first_name = user.first_name
             # sending custom password reset link
             try:
                 user_email = email
                 display_name = first_name.capitalize()
-                generate_custom_password_link_from_firebase.delay(user_email, display_name)
+                # repeated "resend" requests within the dedup window reuse the link already queued
+                coalesced = not claim_email_send(user_email, PASSWORD_RESET)
+                if not coalesced:
+                    generate_custom_password_link_from_firebase.delay(user_email, display_name)
+                record_auth_event(AuthEvent.PASSWORD_RESET, request, email=email, firebase_uid=user.firebase_uid,
+                                  coalesced=coalesced)
                 response = {
                     "status": "success",
                     "message": "Password reset link sent successfully.",
                 }
                 return Response(response, status=status.HTTP_200_OK)
             except Exception:
+                release_email_send(email, PASSWORD_RESET)
                 bad_response = {
                     "status": "failed",
                     "message": "Password reset link could not be sent; Please try again."
                 }
                 return Response(bad_response, status=status.HTTP_400_BAD_REQUEST)
         except User.DoesNotExist:
+            record_auth_event(AuthEvent.PASSWORD_RESET, request, email=email, success=False, reason='user_not_found')
             bad_response = {
                 "status": "failed",
                 "message": "User does not exist."
             }
-            return Response(bad_response, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return Response(bad_response, status=status.HTTP_404_NOT_FOUND)
+
+
+class MetricsView(APIView):
+    """
+    API endpoint to read the counters and latency histograms of the process serving the request.
+    """
+    permission_classes = [HasStaffClaim]
+    authentication_classes = [InternalTokenAuthentication, FirebaseClaimsAuthentication]
+
+    @swagger_auto_schema(
+        operation_summary="Read this process's metrics",
+        operation_description="Return the counters (e.g. email_dedup.<action>.suppressed) and latency histograms "
+                              "of the worker process that serves the request, with its pid. Each worker keeps its "
+                              "own; sum them across workers.",
+        tags=["User Management"],
+        responses={200: "Metrics retrieved successfully.", 403: "Staff claim required."}
+    )
+    def get(self, request: Request):
+        response = {
+            "status": "success",
+            "message": "Metrics retrieved successfully.",
+            "data": dict(metrics.snapshot(), pid=os.getpid())
+        }
+        return Response(response, status=status.HTTP_200_OK)
@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+The user change stream (accounts/changes/stream/) holds its connection open; serve it with
+an ASGI server (e.g. `uvicorn drf_with_firebase_auth.asgi:application`) so that open streams
+do not each tie up a worker thread.
 """
 
 import os
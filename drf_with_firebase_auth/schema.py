@@ -0,0 +1,163 @@
+"""
+Precomputed OpenAPI schema for drf_with_firebase project.
+
+The schema is rendered once at build time with ``python manage.py generate_openapi_schema``
+and served from memory by ``CachedSchemaView`` instead of being introspected on every request.
+"""
+
+import gzip
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views import View
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+
+logger = logging.getLogger(__name__)
+
+api_info = openapi.Info(
+    title="User Management API",
+    default_version='v1',
+    description="API Documentation",
+    terms_of_service="",
+    contact=openapi.Contact(email=""),
+    license=openapi.License(name=""),
+)
+
+SCHEMA_FORMATS = {
+    '.json': ('schema.json', 'application/json'),
+    '.yaml': ('schema.yaml', 'application/yaml'),
+}
+
+
+def get_schema_dir():
+    return Path(getattr(settings, 'OPENAPI_SCHEMA_DIR', settings.BASE_DIR / 'openapi'))
+
+
+def render_schema():
+    """
+    Generate the public schema and encode it in every served format.
+
+    Returns:
+    - dict: Maps each format suffix to the encoded schema bytes.
+
+    """
+    schema = OpenAPISchemaGenerator(info=api_info).get_schema(request=None, public=True)
+    return {
+        '.json': OpenAPICodecJson(validators=[]).encode(schema),
+        '.yaml': OpenAPICodecYaml(validators=[]).encode(schema),
+    }
+
+
+def write_schema(schema_dir=None):
+    """
+    Render the schema and write the plain and gzip-compressed files to `schema_dir`.
+
+    Returns:
+    - list: The paths written.
+
+    """
+    schema_dir = Path(schema_dir or get_schema_dir())
+    schema_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for suffix, body in render_schema().items():
+        path = schema_dir / SCHEMA_FORMATS[suffix][0]
+        gzip_path = path.with_name(path.name + '.gz')
+        # write the compressed copy first so the mtime of the plain file marks a complete build
+        gzip_path.write_bytes(gzip.compress(body, mtime=0))
+        path.write_bytes(body)
+        written += [path, gzip_path]
+    invalidate_schema_cache()
+    return written
+
+
+class _CachedSchema:
+    __slots__ = ('body', 'gzipped', 'etag', 'mtime')
+
+    def __init__(self, body, gzipped, mtime):
+        self.body = body
+        self.gzipped = gzipped
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.mtime = mtime
+
+
+_schema_cache = {}
+_schema_cache_lock = threading.Lock()
+
+
+def invalidate_schema_cache():
+    """
+    Drop the in-memory schema so that the next request reloads it.
+    """
+    with _schema_cache_lock:
+        _schema_cache.clear()
+
+
+def _load_schema(suffix):
+    path = get_schema_dir() / SCHEMA_FORMATS[suffix][0]
+    gzip_path = path.with_name(path.name + '.gz')
+    try:
+        mtime = path.stat().st_mtime
+        body = path.read_bytes()
+    except FileNotFoundError:
+        # no build artifact: generate once in-process and keep it for the life of the worker
+        logger.warning("OpenAPI schema not found at %s; generating it at request time. "
+                       "Run `python manage.py generate_openapi_schema` at build time.", path)
+        body = render_schema()[suffix]
+        return _CachedSchema(body, gzip.compress(body, mtime=0), None)
+    try:
+        gzipped = gzip_path.read_bytes()
+    except FileNotFoundError:
+        gzipped = gzip.compress(body, mtime=0)
+    return _CachedSchema(body, gzipped, mtime)
+
+
+def _is_stale(cached, suffix):
+    # only consulted in debug mode, where a rebuilt schema should show up without a restart
+    if not (settings.DEBUG and getattr(settings, 'OPENAPI_SCHEMA_INVALIDATE_IN_DEBUG', True)):
+        return False
+    try:
+        mtime = (get_schema_dir() / SCHEMA_FORMATS[suffix][0]).stat().st_mtime
+    except FileNotFoundError:
+        return cached.mtime is not None
+    return mtime != cached.mtime
+
+
+def get_cached_schema(suffix):
+    cached = _schema_cache.get(suffix)
+    if cached is None or _is_stale(cached, suffix):
+        with _schema_cache_lock:
+            cached = _schema_cache.get(suffix)
+            if cached is None or _is_stale(cached, suffix):
+                cached = _schema_cache[suffix] = _load_schema(suffix)
+    return cached
+
+
+class CachedSchemaView(View):
+    """
+    Serve the precomputed OpenAPI schema with ETag revalidation and gzip encoding.
+    """
+
+    def get(self, request, format='.json'):
+        cached = get_cached_schema(format)
+        use_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        etag = f'"{cached.etag}-gzip"' if use_gzip else f'"{cached.etag}"'
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if etag in if_none_match or f'"{cached.etag}"' in if_none_match or if_none_match.strip() == '*':
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(cached.gzipped if use_gzip else cached.body,
+                                    content_type=SCHEMA_FORMATS[format][1])
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'OPENAPI_SCHEMA_MAX_AGE', 300)}"
+        return response
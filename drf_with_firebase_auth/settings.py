@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'accounts.middleware.RequestProfilingMiddleware',  # removes itself unless REQUEST_PROFILING is enabled
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # new
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -107,6 +108,9 @@ AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
+    {
+        'NAME': 'accounts.validators.BreachedPasswordValidator',
+    },
 ]
 
 
@@ -187,7 +191,17 @@ SWAGGER_SETTINGS = {
     'APIS_SORTER': 'alpha',
     'SHOW_REQUEST_HEADERS': True,
     'JSON_EDITOR': True,
+    # the UIs load the precomputed schema instead of generating it per request
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
+# precomputed schema, built with `python manage.py generate_openapi_schema`
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'openapi'
+OPENAPI_SCHEMA_MAX_AGE = 300
+# in debug mode, reload the schema whenever the build files change
+OPENAPI_SCHEMA_INVALIDATE_IN_DEBUG = True
 # cors settings
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_METHODS = [
@@ -212,3 +226,201 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+
+# cache settings
+# point CACHE_URL at redis (e.g. redis://localhost:6379/1) so that deduplication windows are shared by every process
+CACHE_URL = os.getenv('CACHE_URL')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    } if CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# auth event log settings
+AUTH_EVENT_LOG = {
+    'ENABLED': True,
+    # 'database' writes to the append-only auth_event table; 'jsonl' writes rotated JSON lines files to PATH
+    'SINK': os.getenv('AUTH_EVENT_LOG_SINK', 'database'),
+    'PATH': os.getenv('AUTH_EVENT_LOG_PATH', str(BASE_DIR / 'auth_events.jsonl')),
+    'MAX_BYTES': 50 * 1024 * 1024,
+    'BACKUP_COUNT': 10,
+    'QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+    # what to do when the queue is full: 'drop_newest', 'drop_oldest' or 'block'
+    'OVERFLOW_POLICY': 'drop_newest',
+}
+
+# negative-lookup filter for unknown emails on the public sign-in and password reset endpoints
+EMAIL_LOOKUP_FILTER = {
+    'ENABLED': True,
+    'FALSE_POSITIVE_RATE': 0.01,
+    'MIN_CAPACITY': 10000,
+    'CAPACITY_HEADROOM': 2.0,
+    # upper bound on the filter size; the false-positive rate rises if the table outgrows it
+    'MAX_BYTES': 16 * 1024 * 1024,
+    # full rebuild from the user table, in seconds
+    'REBUILD_INTERVAL': 300,
+    # pick-up of users created or given a new email by other processes, from the user change log, in seconds
+    'SYNC_INTERVAL': 5,
+}
+
+# password hashing
+# the local password only mirrors the firebase one, so it can use a cheaper profile:
+# 'default' (PASSWORD_HASHERS[0]), 'pbkdf2' (reduced iterations), 'argon2' (needs argon2-cffi)
+# or 'unusable' (store no usable hash). staff and superusers always get the default hasher.
+MIRROR_PASSWORD = {
+    'PROFILE': os.getenv('MIRROR_PASSWORD_PROFILE', 'default'),
+    'PBKDF2_ITERATIONS': 10000,
+    'ARGON2_TIME_COST': 1,
+    'ARGON2_MEMORY_COST': 8192,
+    'ARGON2_PARALLELISM': 1,
+}
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'accounts.hashers.MirrorPBKDF2PasswordHasher',
+    'accounts.hashers.MirrorArgon2PasswordHasher',
+]
+
+# token revocation checks, served from a local cache of each user's tokens_valid_after_time
+FIREBASE_REVOCATION_CHECK = {
+    'ENABLED': True,
+    # seconds before a cached entry is refreshed in the background
+    'TTL': 300,
+    # for a uid not cached yet: 'async' accepts the token and fetches in the background, 'sync' fetches first
+    'COLD_MISS': 'async',
+    # if that 'sync' fetch fails: 'deny' rejects the request with a 401, 'allow' accepts the token
+    'ON_ERROR': 'deny',
+    'MAX_ENTRIES': 100000,
+    'WORKERS': 2,
+}
+
+# sync of is_staff, is_superuser and group roles into firebase custom claims
+FIREBASE_CUSTOM_CLAIMS = {
+    'ENABLED': True,
+    'FLUSH_INTERVAL': 2.0,
+    'BATCH_SIZE': 100,
+    # revoke a user's tokens when a privilege is removed, instead of waiting for them to expire
+    'REVOKE_ON_DEMOTION': True,
+}
+
+# FirebaseAuthentication returns a principal built from the token and loads the User row only when a view needs it
+FIREBASE_AUTH_LAZY_USER = True
+# uids known to belong to an active user, so that the lazy principal checks the account without a query per request
+FIREBASE_AUTH_USER_CACHE = {
+    'TTL': 30,
+    'MAX_ENTRIES': 10000,
+}
+
+# cache of verified firebase ID tokens; entries never outlive the token's exp
+FIREBASE_TOKEN_CACHE = {
+    'ENABLED': True,
+    'MAX_ENTRIES': 10000,
+    'TTL': 300,
+}
+
+# upstream used by the auth/refresh/ endpoint; override the URL to point at a local stub
+FIREBASE_SECURETOKEN = {
+    'URL': os.getenv('FIREBASE_SECURETOKEN_URL', 'https://securetoken.googleapis.com'),
+    'API_KEY': os.getenv('FIREBASE_API_KEY'),
+    'POOL_SIZE': 20,
+    'TIMEOUT': 10,
+}
+
+# batched user deletion
+USER_DELETION = {
+    # uids per auth.delete_users call (at most 1000)
+    'BATCH_SIZE': 1000,
+    # pause between batches, as firebase rate limits delete_users
+    'BATCH_INTERVAL': 1.0,
+    'MAX_ATTEMPTS': 5,
+    # seconds a deletion request waits so that requests arriving together share a batch
+    'SCHEDULE_DELAY': 30,
+}
+# safety net that picks up deletions whose scheduled run was lost
+CELERY_BEAT_SCHEDULE = {
+    'delete-pending-users': {
+        'task': 'accounts.utils.user_deletion.delete_pending_users',
+        'schedule': 300.0,
+    },
+}
+
+# user change feed (changes/ and the changes/stream/ server-sent events endpoint, served under ASGI)
+USER_CHANGE_FEED = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 1000,
+    # committed changes given a cursor per sequencing pass
+    'SEQUENCE_BATCH_SIZE': 500,
+    'POLL_INTERVAL': 1.0,
+    'HEARTBEAT_INTERVAL': 15,
+    'MAX_STREAM_SECONDS': 300,
+    # changes older than this many days are removed by `python manage.py prune_user_changes`
+    'RETENTION_DAYS': 30,
+}
+
+# verification and password reset email deduplication
+EMAIL_DEDUP = {
+    'ENABLED': True,
+    'WINDOW': int(os.getenv('EMAIL_DEDUP_WINDOW', 60)),
+    'CACHE': 'default',
+}
+
+# on-demand request profiling (list captures with `python manage.py list_profiles`)
+REQUEST_PROFILING = {
+    'ENABLED': os.getenv('REQUEST_PROFILING', 'false').lower() == 'true',
+    'SAMPLE_RATE': float(os.getenv('REQUEST_PROFILING_SAMPLE_RATE', 0)),
+    'HEADER': 'X-Profile-Request',
+    'TRACEMALLOC': False,
+    'DIRECTORY': os.getenv('REQUEST_PROFILING_DIR', str(BASE_DIR / 'profiles')),
+    'MAX_PROFILES': 50,
+}
+
+# bulk user lookup (bulk/)
+USER_BULK_LOOKUP = {
+    'MAX_IDS': 500,
+    # larger responses are streamed
+    'STREAM_THRESHOLD': 100,
+}
+
+# several firebase projects and identity platform tenants served by one deployment
+FIREBASE_TENANTS = {
+    'ENABLED': os.getenv('FIREBASE_TENANTS', 'false').lower() == 'true',
+    # the default project (FIREBASE_ADMIN_SDK_CREDENTIALS_PATH) is always served; list its tenants here too
+    'PROJECTS': {
+        # 'other-project-id': {
+        #     'CREDENTIALS_PATH': '/path/to/other-project-admin-sdk.json',
+        #     'TENANTS': ['tenant-a', 'tenant-b'],  # or '*' for any tenant of the project
+        #     'HOSTS': {'tenant-a.example.com': 'tenant-a', 'other.example.com': None},
+        # },
+    },
+    'MAX_TENANTS': 32,
+    'TOKEN_CACHE_MAX_ENTRIES': 2000,
+    'REVOCATION_MAX_ENTRIES': 10000,
+    # create users of the projects and tenants above on their first request; otherwise create them separately
+    'PROVISION_USERS': os.getenv('FIREBASE_TENANTS_PROVISION_USERS', 'false').lower() == 'true',
+}
+
+# breached password index, compiled with `python manage.py compile_breached_passwords <pwned-passwords-sha1.txt>`
+BREACHED_PASSWORDS = {
+    'ENABLED': True,
+    'PATH': os.getenv('BREACHED_PASSWORDS_PATH', str(BASE_DIR / 'breached_passwords.idx')),
+}
+
+# internal access tokens exchanged at auth/internal-token/ for service-to-service calls
+# INTERNAL_TOKEN_KEYS is "key-id:secret,key-id:secret"; to rotate, add the new key, make it active, and drop the old
+# one once LIFETIME has passed
+INTERNAL_TOKENS = {
+    'ENABLED': True,
+    'KEYS': dict(
+        entry.split(':', 1) for entry in os.getenv('INTERNAL_TOKEN_KEYS', '').split(',') if ':' in entry
+    ),
+    'ACTIVE_KEY': os.getenv('INTERNAL_TOKEN_ACTIVE_KEY'),
+    'LIFETIME': int(os.getenv('INTERNAL_TOKEN_LIFETIME', 300)),
+}
@@ -15,5 +15,6 @@ setup(
         'drf-yasg',
         'celery',
         'redis',
+        'requests',
     ],
 )